@@ -5,11 +5,11 @@ Dash Agents
 Test: python -m dash.agents
 """
 
+import sys
 from os import getenv
 
 from agno.agent import Agent
 from agno.knowledge import Knowledge
-from agno.knowledge.embedder.openai import OpenAIEmbedder
 from agno.learn import (
     LearnedKnowledgeConfig,
     LearningMachine,
@@ -26,14 +26,15 @@ from agno.vectordb.pgvector import PgVector, SearchType
 
 from dash.context.business_rules import BUSINESS_CONTEXT
 from dash.context.semantic_model import SEMANTIC_MODEL_STR
+from dash.embedder import CachedOpenAIEmbedder
 from dash.tools import (
     create_export_to_excel_tool,
     create_introspect_schema_tool,
     create_save_learning_tool,
     create_save_validated_query_tool,
 )
-from db import db_url, get_postgres_db
-from db.duckdb_url import duckdb_url
+from db import db_url, get_db_engine, get_postgres_db
+from db.duckdb_url import get_duckdb_engine
 
 # ============================================================================
 # Database & Knowledge
@@ -41,14 +42,18 @@ from db.duckdb_url import duckdb_url
 
 agent_db = get_postgres_db()
 
+# One embedder for both knowledge bases: a single HTTP client and a shared query cache
+embedder = CachedOpenAIEmbedder(id="text-embedding-3-small")
+
 # KNOWLEDGE: Static, curated (table schemas, validated queries, business rules)
 dash_knowledge = Knowledge(
     name="Dash Knowledge",
     vector_db=PgVector(
         db_url=db_url,
+        db_engine=get_db_engine(),
         table_name="dash_knowledge",
         search_type=SearchType.hybrid,
-        embedder=OpenAIEmbedder(id="text-embedding-3-small"),
+        embedder=embedder,
     ),
     contents_db=get_postgres_db(contents_table="dash_knowledge_contents"),
 )
@@ -58,9 +63,10 @@ dash_learnings = Knowledge(
     name="Dash Learnings",
     vector_db=PgVector(
         db_url=db_url,
+        db_engine=get_db_engine(),
         table_name="dash_learnings",
         search_type=SearchType.hybrid,
-        embedder=OpenAIEmbedder(id="text-embedding-3-small"),
+        embedder=embedder,
     ),
     contents_db=get_postgres_db(contents_table="dash_learnings_contents"),
 )
@@ -71,11 +77,13 @@ dash_learnings = Knowledge(
 
 save_validated_query = create_save_validated_query_tool(dash_knowledge)
 save_learning = create_save_learning_tool(dash_learnings)
-introspect_schema = create_introspect_schema_tool(duckdb_url)
-export_to_excel = create_export_to_excel_tool(duckdb_url)
+# One DuckDB engine for all SQL tools; the data file is first touched on connect
+duckdb_engine = get_duckdb_engine()
+introspect_schema = create_introspect_schema_tool(duckdb_engine)
+export_to_excel = create_export_to_excel_tool(duckdb_engine)
 
 base_tools: list = [
-    SQLTools(db_url=duckdb_url),
+    SQLTools(db_engine=duckdb_engine),
     save_validated_query,
     save_learning,
     introspect_schema,
@@ -182,13 +190,15 @@ freeze panes, and auto-filters. Pass the same SQL query and a descriptive title.
 
 {BUSINESS_CONTEXT}\
 """
+# Shared by both agents rather than copied per agent
+INSTRUCTIONS = sys.intern(INSTRUCTIONS)
 
 # ============================================================================
 # Create Agent
 # ============================================================================
 
-dash = Agent(
-    name="Dash",
+# Shared by reference between both agents; only name and tools differ
+_agent_kwargs: dict = dict(
     model=Claude(id="claude-opus-4-5-20251101"),
     db=agent_db,
     instructions=INSTRUCTIONS,
@@ -203,7 +213,6 @@ dash = Agent(
         user_memory=UserMemoryConfig(mode=LearningMode.AGENTIC),
         learned_knowledge=LearnedKnowledgeConfig(mode=LearningMode.ALWAYS),
     ),
-    tools=base_tools,
     # Context
     add_datetime_to_context=True,
     add_history_to_context=True,
@@ -212,12 +221,13 @@ dash = Agent(
     markdown=True,
 )
 
+dash = Agent(name="Dash", tools=base_tools, **_agent_kwargs)
+
 # Reasoning variant - adds multi-step reasoning capabilities
-reasoning_dash = dash.deep_copy(
-    update={
-        "name": "Reasoning Dash",
-        "tools": base_tools + [ReasoningTools(add_instructions=True)],
-    }
+reasoning_dash = Agent(
+    name="Reasoning Dash",
+    tools=base_tools + [ReasoningTools(add_instructions=True)],
+    **_agent_kwargs,
 )
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+"""OpenAI embedder with a cache for repeated query embeddings."""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from threading import Lock
+
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+# Module-level so the embedder stays deep-copyable
+_CACHE_LOCK = Lock()
+
+
+@dataclass
+class CachedOpenAIEmbedder(OpenAIEmbedder):
+    """OpenAIEmbedder that memoizes get_embedding results.
+
+    Every knowledge search embeds its query text, so repeated searches for the
+    same text (save_learning's verification retry, recurring questions) each
+    cost an OpenAI round trip. Results are kept in an LRU keyed by a digest of
+    the text. Empty vectors, which the base class returns on API errors, are
+    not cached.
+    """
+
+    cache_size: int = 1024
+    _cache: OrderedDict[bytes, list[float]] = field(default_factory=OrderedDict, init=False, repr=False)
+
+    def _cache_get(self, key: bytes) -> list[float] | None:
+        with _CACHE_LOCK:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+            return embedding
+
+    def _cache_put(self, key: bytes, embedding: list[float]) -> None:
+        if not embedding:
+            return
+        with _CACHE_LOCK:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_embedding(self, text: str) -> list[float]:
+        key = blake2b(text.encode(), digest_size=16).digest()
+        embedding = self._cache_get(key)
+        if embedding is None:
+            embedding = super().get_embedding(text)
+            self._cache_put(key, embedding)
+        return embedding
+
+    async def async_get_embedding(self, text: str) -> list[float]:
+        key = blake2b(text.encode(), digest_size=16).digest()
+        embedding = self._cache_get(key)
+        if embedding is None:
+            embedding = await super().async_get_embedding(text)
+            self._cache_put(key, embedding)
+        return embedding
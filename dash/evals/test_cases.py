@@ -247,6 +247,14 @@ CATEGORIES = ["basic", "aggregation", "data_quality", "complex", "edge_case"]
 
 
 # Backward compatibility: export as tuples for any code expecting the old format
-def get_legacy_test_cases() -> list[tuple[str, list[str], str]]:
-    """Get test cases in legacy tuple format (question, expected_strings, category)."""
-    return [(tc.question, tc.expected_strings, tc.category) for tc in TEST_CASES]
+_LEGACY_TEST_CASES: tuple[tuple[str, list[str], str], ...] = tuple(
+    (tc.question, tc.expected_strings, tc.category) for tc in TEST_CASES
+)
+
+
+def get_legacy_test_cases() -> tuple[tuple[str, list[str], str], ...]:
+    """Get test cases in legacy tuple format (question, expected_strings, category).
+
+    Built once at import; callers needing a mutable copy can wrap it in list().
+    """
+    return _LEGACY_TEST_CASES
@@ -1,15 +1,27 @@
 """Export SQL query results to formatted Excel files."""
 
 import re
+import string
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
 from datetime import datetime
+from functools import lru_cache
+from hashlib import blake2b
 from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING
 
-import pandas as pd
 from agno.tools import tool
 from agno.utils.log import logger
-from sqlalchemy import create_engine, text
+from sqlalchemy import Engine, create_engine, text
 from sqlalchemy.exc import DatabaseError, OperationalError
 
+# pandas and duckdb are imported on first export so agent startup doesn't pay for them
+if TYPE_CHECKING:
+    import duckdb
+    import pandas as pd
+
 # Column name patterns → Excel number formats
 _FORMAT_RULES: list[tuple[re.Pattern, str]] = [
     (re.compile(r"price|cost|revenue|amount|total|balance|acctbal|extendedprice|supplycost", re.I), "$#,##0.00"),
@@ -18,11 +30,37 @@ _FORMAT_RULES: list[tuple[re.Pattern, str]] = [
     (re.compile(r"date|_dt$|_at$", re.I), "YYYY-MM-DD"),
 ]
 
+# Write/DDL keywords rejected by the export guard
+_DANGEROUS_RE = re.compile(r"\b(drop|delete|truncate|insert|update|alter|create)\b", re.I)
+
+
+class _SlugTable(dict):
+    """str.translate table keeping [a-z0-9] and mapping every other character to "_"."""
+
+    def __missing__(self, key: int) -> str:
+        return "_"
+
+
+_SLUG_TABLE = _SlugTable({ord(c): c for c in string.ascii_lowercase + string.digits})
+_UNDERSCORES_RE = re.compile(r"__+")
+
+# Functions whose results change between runs; queries using them bypass the result cache
+_VOLATILE_RE = re.compile(r"\b(now|today|current_date|current_time|current_timestamp|random)\b", re.I)
+
 MAX_ROWS = 100_000
+_RESULT_CACHE_SIZE = 16
+_RESULT_CACHE_TTL = 300  # seconds
+_MAX_COL_WIDTH = 60
+# Rows fetched from the database / converted for writing at a time (five DuckDB vectors)
+_CHUNK_ROWS = 10_240
 
 
+@lru_cache(maxsize=512)
 def _detect_format(col_name: str, dtype: str) -> str | None:
-    """Pick an Excel number format based on column name and pandas dtype."""
+    """Pick an Excel number format based on column name and pandas dtype.
+
+    Memoized: the rules are fixed, and repeat exports reuse the same schemas.
+    """
     for pattern, fmt in _FORMAT_RULES:
         if pattern.search(col_name):
             return fmt
@@ -33,11 +71,121 @@ def _detect_format(col_name: str, dtype: str) -> str | None:
     return None
 
 
-def create_export_to_excel_tool(db_url: str):
-    """Create export_to_excel tool with database connection."""
-    engine = create_engine(db_url)
+def _column_formats(df: "pd.DataFrame") -> list[str | None]:
+    """Detect the Excel number format of every column, in column order."""
+    return [_detect_format(str(name), str(dtype)) for name, dtype in df.dtypes.items()]
+
+
+def _column_values(chunk: "pd.DataFrame") -> list[list]:
+    """Convert each column of a chunk to a list of Python values, nulls as None.
+
+    tolist() converts a whole column at once, so only the columns that actually
+    contain nulls get a per-cell fix-up.
+    """
+    columns = []
+    for _, col in chunk.items():
+        values = col.tolist()
+        if col.hasnans:
+            for i in col.isna().to_numpy().nonzero()[0]:
+                values[i] = None
+        columns.append(values)
+    return columns
+
+
+def _duckdb_chunks(con: "duckdb.DuckDBPyConnection") -> Iterator["pd.DataFrame"]:
+    """Yield the pending result of a DuckDB connection as DataFrame chunks."""
+    while True:
+        chunk = con.fetch_df_chunk(_CHUNK_ROWS // 2048)
+        yield chunk
+        if chunk.empty:
+            return
+
+
+def _read_capped(chunks: Iterable["pd.DataFrame"]) -> "pd.DataFrame":
+    """Concatenate result chunks, stopping as soon as more than MAX_ROWS have arrived.
+
+    Oversized results are rejected after at most one chunk past the limit
+    instead of being read into memory in full.
+    """
+    import pandas as pd
+
+    frames: list[pd.DataFrame] = []
+    total = 0
+    for chunk in chunks:
+        if frames and chunk.empty:
+            break
+        frames.append(chunk)
+        total += len(chunk)
+        if total > MAX_ROWS:
+            break
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def create_export_to_excel_tool(db: str | Engine):
+    """Create export_to_excel tool with database connection (a URL or a shared Engine).
+
+    Connections come from the engine's pool. For DuckDB the query runs on the
+    pooled DuckDB connection itself, which builds the DataFrame column by column
+    instead of fetching Python row tuples through the DBAPI layer. Going through
+    duckdb-engine (rather than duckdb.connect) keeps the connection config equal
+    to SQLTools' and introspect_schema's; DuckDB refuses to open one file twice
+    in a process with different configs, read_only included.
+    """
+    engine = db if isinstance(db, Engine) else create_engine(db)
+    is_duckdb = engine.dialect.name == "duckdb"
+    # Errors reported back to the agent; the native DuckDB path raises duckdb.Error.
+    # duckdb is only imported for DuckDB URLs, whose dialect has already loaded it.
+    query_errors: tuple[type[Exception], ...] = (OperationalError, DatabaseError)
+    if is_duckdb:
+        import duckdb
+
+        query_errors += (duckdb.Error,)
     exports_dir = Path(__file__).parent.parent.parent / "outputs" / "exports"
 
+    def run_query(query: str) -> "pd.DataFrame":
+        with engine.connect() as conn:
+            if is_duckdb:
+                # duckdb-engine's wrapper forwards to the native DuckDB connection
+                duck = conn.connection.dbapi_connection
+                duck.execute(query)
+                return _read_capped(_duckdb_chunks(duck))
+            import pandas as pd
+
+            try:
+                chunks = pd.read_sql(text(query), conn, chunksize=_CHUNK_ROWS)
+            except pd.errors.DatabaseError as e:
+                # pandas wraps the SQLAlchemy error; surface that one to the caller
+                if isinstance(e.__cause__, DatabaseError | OperationalError):
+                    raise e.__cause__ from None
+                raise
+            return _read_capped(chunks)
+
+    # Re-exports of the same SQL (e.g. with a new title) skip the database
+    result_cache: OrderedDict[str, tuple[float, pd.DataFrame]] = OrderedDict()
+    cache_lock = Lock()
+
+    def read_query(query: str) -> "pd.DataFrame":
+        if _VOLATILE_RE.search(query):
+            return run_query(query)
+
+        key = blake2b(query.strip().encode(), digest_size=16).hexdigest()
+        with cache_lock:
+            cached = result_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < _RESULT_CACHE_TTL:
+                result_cache.move_to_end(key)
+                return cached[1]
+
+        df = run_query(query)
+        if len(df) <= MAX_ROWS:
+            with cache_lock:
+                result_cache[key] = (time.monotonic(), df)
+                result_cache.move_to_end(key)
+                while len(result_cache) > _RESULT_CACHE_SIZE:
+                    result_cache.popitem(last=False)
+        return df
+
     @tool
     def export_to_excel(
         query: str,
@@ -53,32 +201,33 @@ def create_export_to_excel_tool(db_url: str):
             title: Optional report title shown above the data.
             sheet_name: Worksheet name (default "Data").
         """
-        sql = query.strip().lower()
-        if not sql.startswith("select") and not sql.startswith("with"):
+        # Only the leading keyword needs case-folding; the regex below is case-insensitive
+        sql = query.lstrip()
+        head = sql[:6].lower()
+        if not head.startswith("select") and not head.startswith("with"):
             return "Error: Only SELECT queries can be exported."
 
-        dangerous = ["drop", "delete", "truncate", "insert", "update", "alter", "create"]
-        for kw in dangerous:
-            if f" {kw} " in f" {sql} ":
-                return f"Error: Query contains dangerous keyword: {kw}"
+        match = _DANGEROUS_RE.search(sql)
+        if match:
+            return f"Error: Query contains dangerous keyword: {match.group(1).lower()}"
 
         # Execute query
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql(text(query), conn)
-        except (OperationalError, DatabaseError) as e:
+            df = read_query(query)
+        except query_errors as e:
             logger.error(f"export_to_excel query failed: {e}")
             return f"Error executing query: {e}"
 
         if df.empty:
             return "Error: Query returned no rows."
         if len(df) > MAX_ROWS:
-            return f"Error: Result has {len(df):,} rows (max {MAX_ROWS:,}). Add a LIMIT clause."
+            return f"Error: Result has more than {MAX_ROWS:,} rows. Add a LIMIT clause."
 
         # Build file path
         exports_dir.mkdir(parents=True, exist_ok=True)
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        slug = re.sub(r"[^a-z0-9]+", "_", (title or "export").lower()).strip("_")[:60]
+        slug = (title or "export").lower().translate(_SLUG_TABLE)
+        slug = _UNDERSCORES_RE.sub("_", slug).strip("_")[:60]
         filepath = exports_dir / f"{slug}_{ts}.xlsx"
 
         try:
@@ -94,22 +243,30 @@ def create_export_to_excel_tool(db_url: str):
 
 
 def _write_excel(
-    df: pd.DataFrame,
+    df: "pd.DataFrame",
     filepath: Path,
     title: str | None = None,
     sheet_name: str = "Data",
 ) -> None:
-    """Write a DataFrame to Excel with professional formatting."""
+    """Write a DataFrame to Excel with professional formatting.
+
+    The workbook runs in xlsxwriter's constant_memory mode, which flushes each
+    row to disk once a later row is started. Everything is therefore written
+    top to bottom (title, header, data), and features that need earlier rows
+    kept in memory (merge_range, autofit) are replaced with equivalents.
+    """
+    import pandas as pd
 
     # Row where data headers start (0-indexed)
     header_row = 2 if title else 0
     data_start = header_row + 1
 
-    with pd.ExcelWriter(filepath, engine="xlsxwriter") as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=header_row)
+    fmt_codes = _column_formats(df)
 
+    options = {"constant_memory": True, "default_date_format": "YYYY-MM-DD"}
+    with pd.ExcelWriter(filepath, engine="xlsxwriter", engine_kwargs={"options": options}) as writer:
         wb = writer.book
-        ws = writer.sheets[sheet_name]
+        ws = wb.add_worksheet(sheet_name)
         num_rows = len(df)
         num_cols = len(df.columns)
 
@@ -144,57 +301,49 @@ def _write_excel(
         )
 
         # ── Title row ────────────────────────────────────────────
+        # merge_range is unavailable in constant_memory mode; the text overflows
+        # into the blank formatted cells, which carry the underline across.
         if title:
-            if num_cols > 1:
-                ws.merge_range(0, 0, 0, num_cols - 1, title, title_fmt)
-            else:
-                ws.write(0, 0, title, title_fmt)
+            padding = [None] * (num_cols - 1)
+            ws.write_row(0, 0, [title, *padding], title_fmt)
             generated = f"Generated {datetime.now().strftime('%Y-%m-%d %H:%M')}  •  {num_rows:,} rows"
-            if num_cols > 1:
-                ws.merge_range(1, 0, 1, num_cols - 1, generated, subtitle_fmt)
-            else:
-                ws.write(1, 0, generated, subtitle_fmt)
-
-        # ── Header formatting ────────────────────────────────────
-        for col_idx, col_name in enumerate(df.columns):
-            ws.write(header_row, col_idx, col_name, header_fmt)
-
-        # ── Column number formats + alternating row stripes ──────
-        for col_idx, col_name in enumerate(df.columns):
-            dtype_str = str(df[col_name].dtype)
-            fmt_code = _detect_format(col_name, dtype_str)
-
-            # Build per-column data format (with and without stripe)
-            plain_props = {}
-            if fmt_code:
-                plain_props["num_format"] = fmt_code
-            col_fmt = wb.add_format(plain_props) if plain_props else None
-
-            stripe_props = {"bg_color": "#F2F2F2"}
-            if fmt_code:
-                stripe_props["num_format"] = fmt_code
-            col_stripe_fmt = wb.add_format(stripe_props)
-
-            # Write each data cell with the right format
-            for row_idx in range(num_rows):
-                value = df.iat[row_idx, col_idx]
-                # Convert numpy/pandas types to native Python
-                if pd.isna(value):
-                    value = ""
-                elif hasattr(value, "item"):
-                    value = value.item()
-
-                excel_row = data_start + row_idx
-                is_stripe = row_idx % 2 == 1
-
-                if is_stripe:
-                    ws.write(excel_row, col_idx, value, col_stripe_fmt)
-                elif col_fmt:
-                    ws.write(excel_row, col_idx, value, col_fmt)
-                else:
-                    ws.write(excel_row, col_idx, value)
-
-        # ── Auto-fit, freeze, filter ─────────────────────────────
-        ws.autofit()
+            ws.write_row(1, 0, [generated, *padding], subtitle_fmt)
+
+        # ── Header row ───────────────────────────────────────────
+        ws.write_row(header_row, 0, [str(c) for c in df.columns], header_fmt)
+
+        # ── Column widths + number formats ───────────────────────
+        # autofit() needs every row in memory, so estimate from a sample.
+        # Columns sharing a number format share one Format object.
+        sample = df.head(1000)
+        num_formats = {code: wb.add_format({"num_format": code}) for code in dict.fromkeys(fmt_codes) if code}
+        for col_idx, (col_name, fmt_code) in enumerate(zip(df.columns, fmt_codes)):
+            col_fmt = num_formats.get(fmt_code) if fmt_code else None
+            values_width = sample[col_name].astype(str).str.len().max() if num_rows else 0
+            width = min(max(len(str(col_name)), int(values_width)) + 2, _MAX_COL_WIDTH)
+            ws.set_column(col_idx, col_idx, width, col_fmt)
+
+        # ── Data rows, in order ──────────────────────────────────
+        # Converted column-wise a chunk at a time, then written row by row as
+        # constant_memory requires
+        for start in range(0, num_rows, _CHUNK_ROWS):
+            columns = _column_values(df.iloc[start : start + _CHUNK_ROWS])
+            for row_idx, row in enumerate(zip(*columns), start=data_start + start):
+                ws.write_row(row_idx, 0, row)
+
+        # ── Alternating row stripes ──────────────────────────────
+        # A single conditional format over the data range replaces per-cell
+        # stripe formats; it only sets the fill, so column number formats apply.
+        # (A set_row() stripe would not: row formats take precedence over
+        # column formats for unformatted cells, dropping the number formats.)
+        ws.conditional_format(
+            data_start,
+            0,
+            data_start + num_rows - 1,
+            num_cols - 1,
+            {"type": "formula", "criteria": f"=MOD(ROW()-{data_start},2)=0", "format": stripe_fmt},
+        )
+
+        # ── Freeze, filter ───────────────────────────────────────
         ws.freeze_panes(data_start, 0)
         ws.autofilter(header_row, 0, header_row + num_rows, num_cols - 1)
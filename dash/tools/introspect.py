@@ -2,13 +2,13 @@
 
 from agno.tools import tool
 from agno.utils.log import logger
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import Engine, create_engine, inspect, text
 from sqlalchemy.exc import DatabaseError, OperationalError
 
 
-def create_introspect_schema_tool(db_url: str):
-    """Create introspect_schema tool with database connection."""
-    engine = create_engine(db_url)
+def create_introspect_schema_tool(db: str | Engine):
+    """Create introspect_schema tool with database connection (a URL or a shared Engine)."""
+    engine = db if isinstance(db, Engine) else create_engine(db)
 
     @tool
     def introspect_schema(
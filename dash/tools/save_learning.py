@@ -2,6 +2,7 @@
 
 import json
 import time
+from hashlib import blake2b
 
 from agno.knowledge import Knowledge
 from agno.knowledge.reader.text_reader import TextReader
@@ -9,8 +10,44 @@ from agno.tools import tool
 from agno.utils.log import logger
 
 
+def _learning_exists(knowledge: Knowledge, name: str, title: str) -> bool:
+    """Check that a learning's vectors were stored.
+
+    Uses a by-name point lookup on the vector table, which needs no embedding call.
+    Falls back to a similarity search, restricted to learnings, for vector DBs
+    without name lookups.
+    """
+    if knowledge.vector_db is not None:
+        try:
+            return knowledge.vector_db.name_exists(name)
+        except NotImplementedError:
+            pass
+    results = knowledge.search(query=title, max_results=3, filters={"type": "learning"})
+    return any(name in (doc.name or "") for doc in results)
+
+
+def _content_digest(payload: dict) -> str:
+    """Digest of a learning's body (learning, context, tags); the title is left out.
+
+    Each field is length-prefixed, so distinct bodies (no context vs an empty
+    one, [] vs [""], separators inside tags) never share an encoding, and the
+    payload is still serialized only once, for the stored text.
+    """
+    context = payload.get("context")
+    fields = [payload["learning"], *([] if context is None else [context]), *payload["tags"]]
+    h = blake2b(f"{context is not None:d}{len(fields)}".encode(), digest_size=16)
+    for field in fields:
+        data = field.encode()
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
 def create_save_learning_tool(knowledge: Knowledge):
     """Create save_learning tool with verification after insert."""
+    # Content digests of learnings verified this process; a repeat (even under a
+    # new title) is answered without another embedding call and insert
+    saved_digests: set[str] = set()
 
     @tool
     def save_learning(
@@ -46,6 +83,11 @@ def create_save_learning_tool(knowledge: Knowledge):
 
         name = title.strip().lower().replace(" ", "_")[:80]
         text_content = json.dumps(payload, ensure_ascii=False, indent=2)
+        digest = _content_digest(payload)
+        if digest in saved_digests:
+            return f"Learning '{title}' already saved (content hash match)"
+        # Stored as vector metadata so searches can filter on type and tags
+        metadata = {"type": "learning", "tags": payload["tags"]}
 
         max_attempts = 2
         for attempt in range(max_attempts):
@@ -53,6 +95,7 @@ def create_save_learning_tool(knowledge: Knowledge):
                 knowledge.insert(
                     name=name,
                     text_content=text_content,
+                    metadata=metadata,
                     reader=TextReader(),
                     skip_if_exists=True,
                 )
@@ -65,20 +108,18 @@ def create_save_learning_tool(knowledge: Knowledge):
 
             # Verify the learning was actually persisted
             try:
-                results = knowledge.search(query=title.strip(), max_results=3)
-                if results:
-                    for doc in results:
-                        if name in (doc.name or ""):
-                            logger.info(f"Learning verified: '{title}'")
-                            return f"Learning saved and verified: '{title}'"
+                if _learning_exists(knowledge, name, title.strip()):
+                    saved_digests.add(digest)
+                    logger.info(f"Learning verified: '{title}'")
+                    return f"Learning saved and verified: '{title}'"
                 # Not found — retry
                 logger.warning(f"Learning not found after insert (attempt {attempt + 1})")
                 if attempt < max_attempts - 1:
-                    time.sleep(0.5)
+                    time.sleep(0.1)
             except Exception as e:
                 logger.error(f"save_learning verification failed: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(0.5)
+                    time.sleep(0.1)
 
         return f"Warning: Learning '{title}' was inserted but could not be verified. It may not have persisted."
 
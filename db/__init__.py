@@ -5,10 +5,11 @@ Database Module
 Database connection utilities.
 """
 
-from db.session import get_postgres_db
+from db.session import get_db_engine, get_postgres_db
 from db.url import db_url
 
 __all__ = [
     "db_url",
+    "get_db_engine",
     "get_postgres_db",
 ]
@@ -5,29 +5,90 @@ DuckDB URL Builder
 Build DuckDB connection URL for TPC-H data.
 """
 
+from collections.abc import Iterator
+from contextlib import contextmanager
+from functools import cache
 from os import getenv
 from pathlib import Path
+from typing import Any
+
+from agno.utils.log import logger
+from sqlalchemy import Engine, create_engine, event
 
 
 def build_duckdb_url() -> str:
     """Build DuckDB URL for TPC-H data.
 
+    Only path arithmetic: the file itself is checked on first connection by
+    the engine from get_duckdb_engine().
+
     Returns:
         DuckDB connection URL in SQLAlchemy format.
     """
-    # Get path from env or use default
-    db_path = getenv("DUCKDB_PATH", "data/tpch_sf1.db")
-
-    # Convert to absolute path
-    db_path = Path(db_path).resolve()
-
-    # Verify file exists
-    if not db_path.exists():
-        print(f"Warning: DuckDB file not found at {db_path}")
+    # Get path from env or use default, as an absolute path
+    db_path = Path(getenv("DUCKDB_PATH", "data/tpch_sf1.db")).absolute()
 
     # DuckDB SQLAlchemy URL format: duckdb:///path/to/file.db
     return f"duckdb:///{db_path}"
 
 
-# Export the URL
-duckdb_url = build_duckdb_url()
+@cache
+def get_duckdb_url() -> str:
+    """Return the DuckDB URL, building it on first call.
+
+    Returns:
+        DuckDB connection URL in SQLAlchemy format.
+    """
+    return build_duckdb_url()
+
+
+@cache
+def _warn_if_missing(db_path: str) -> None:
+    """Log a warning, once per path, if the DuckDB file does not exist."""
+    if not Path(db_path).exists():
+        logger.warning(f"DuckDB file not found at {db_path}")
+
+
+@cache
+def get_duckdb_engine() -> Engine:
+    """Return the process-wide SQLAlchemy engine for the DuckDB database.
+
+    SQLTools, introspect_schema and export_to_excel share this engine, and so
+    one pool and one DuckDB connection config. Creating it touches no files;
+    the data file is checked just before the first connection.
+
+    Returns:
+        Shared Engine, created on first call.
+    """
+    engine = create_engine(get_duckdb_url())
+
+    @event.listens_for(engine, "do_connect")
+    def _check_file(dialect, conn_rec, cargs, cparams):
+        # Before connecting: DuckDB would otherwise create an empty file
+        _warn_if_missing(engine.url.database)
+
+    return engine
+
+
+@contextmanager
+def duckdb_connection() -> Iterator[Any]:
+    """Check out a native DuckDB connection from the shared engine's pool.
+
+    DuckDB refuses a second connection to a file with a different config
+    (read_only included), so code running next to the agent in one process
+    must connect through this rather than duckdb.connect. The connection is
+    exclusive to the caller until the block exits.
+
+    Yields:
+        duckdb-engine's connection wrapper, which forwards execute, fetchmany,
+        interrupt etc. to the DuckDBPyConnection.
+    """
+    with get_duckdb_engine().connect() as conn:
+        yield conn.connection.dbapi_connection
+
+
+def __getattr__(name: str) -> str:
+    # Backward compatibility: `from db.duckdb_url import duckdb_url` resolves lazily
+    if name == "duckdb_url":
+        return get_duckdb_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,13 +5,28 @@ Database Session
 PostgreSQL database connection for AgentOS.
 """
 
+from functools import cache
+
 from agno.db.postgres import PostgresDb
+from sqlalchemy import Engine, create_engine
 
 from db.url import db_url
 
 DB_ID = "dash-db"
 
 
+@cache
+def get_db_engine() -> Engine:
+    """Return the process-wide SQLAlchemy engine for the Postgres database.
+
+    Every PostgresDb and PgVector shares this engine, and so one connection pool.
+
+    Returns:
+        Shared Engine, created on first call.
+    """
+    return create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
+
+
 def get_postgres_db(contents_table: str | None = None) -> PostgresDb:
     """Create a PostgresDb instance.
 
@@ -22,5 +37,5 @@ def get_postgres_db(contents_table: str | None = None) -> PostgresDb:
         Configured PostgresDb instance.
     """
     if contents_table is not None:
-        return PostgresDb(id=DB_ID, db_url=db_url, knowledge_table=contents_table)
-    return PostgresDb(id=DB_ID, db_url=db_url)
+        return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_db_engine(), knowledge_table=contents_table)
+    return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_db_engine())
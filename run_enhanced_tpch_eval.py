@@ -7,10 +7,16 @@ Compares Dash's SQL generation against actual TPC-H queries with result validati
 import json
 import time
 import re
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
-import duckdb
 from dash.agents import dash
+from db.duckdb_url import duckdb_connection
+
+SUMMARY_FILE = 'enhanced_tpch_eval_summary.jsonl'
+
+# Fallback pattern for SQL outside a ```sql fence, compiled once
+_SELECT_RE = re.compile(r'(SELECT[\s\S]*?(?:;|$))', re.IGNORECASE)
 
 # TPC-H Queries with natural language prompts and golden SQL
 TPCH_QUERIES = [
@@ -31,7 +37,7 @@ SELECT
     AVG(l_discount) AS avg_disc,
     COUNT(*) AS count_order
 FROM lineitem
-WHERE l_shipdate <= DATE '1998-12-01' - INTERVAL '90' DAY
+WHERE l_shipdate <= DATE '1998-09-02'
 GROUP BY l_returnflag, l_linestatus
 ORDER BY l_returnflag, l_linestatus
         """,
@@ -175,41 +181,63 @@ WHERE l_partkey = p_partkey
 
 def extract_sql_from_response(response_content):
     """Extract SQL from agent response."""
-    # Look for SQL code blocks
-    sql_pattern = r'```sql\n(.*?)\n```'
-    matches = re.findall(sql_pattern, response_content, re.DOTALL)
-    if matches:
-        return matches[0].strip()
+    # Neither pattern can match without a code fence or a SELECT keyword
+    if '```' not in response_content and 'select' not in response_content.lower():
+        return None
+
+    # Look for SQL code blocks with plain str.find scans rather than a regex
+    start = response_content.find('```sql\n')
+    if start != -1:
+        end = response_content.find('\n```', start + 7)
+        if end != -1:
+            return response_content[start + 7:end].strip()
 
     # Look for SQL without code blocks (common patterns)
-    select_pattern = r'(SELECT[\s\S]*?(?:;|$))'
-    matches = re.findall(select_pattern, response_content, re.IGNORECASE)
-    if matches:
+    match = _SELECT_RE.search(response_content)
+    if match:
         # Take the first complete SELECT statement
-        return matches[0].strip().rstrip(';')
+        return match.group(1).strip().rstrip(';')
 
     return None
 
 
-def execute_sql(sql, db_path):
-    """Execute SQL against DuckDB and return results."""
+def execute_sql(sql):
+    """Execute SQL against DuckDB and return results.
+
+    Runs on a connection from the agent's DuckDB engine (a separate read-only
+    connection to the same file would make the agent's fail), inside a
+    transaction that is always rolled back, since the SQL may come from the agent.
+    """
     try:
-        conn = duckdb.connect(db_path, read_only=True)
-        result = conn.execute(sql).fetchall()
-        conn.close()
-        return result, None
+        with duckdb_connection() as conn:
+            conn.begin()
+            try:
+                return conn.execute(sql).fetchall(), None
+            finally:
+                conn.rollback()
     except Exception as e:
         return None, str(e)
 
 
+def _row_set(rows):
+    """Build a set of row tuples.
+
+    DuckDB's fetchall() returns a list of tuples, which is hashed as-is in C;
+    other row shapes are normalized one row at a time.
+    """
+    if rows and type(rows[0]) is tuple:
+        return set(rows)
+    return set(tuple(row) if isinstance(row, (list, tuple)) else (row,) for row in rows)
+
+
 def compare_results(dash_results, golden_results):
     """Compare query results for similarity."""
     if dash_results is None or golden_results is None:
         return 0.0, "One or both queries failed"
 
     # Convert to sets for comparison (order-independent)
-    dash_set = set(tuple(row) if isinstance(row, (list, tuple)) else (row,) for row in dash_results)
-    golden_set = set(tuple(row) if isinstance(row, (list, tuple)) else (row,) for row in golden_results)
+    dash_set = _row_set(dash_results)
+    golden_set = _row_set(golden_results)
 
     if len(golden_set) == 0:
         return 0.0, "Golden query returned no results"
@@ -230,11 +258,32 @@ def compare_results(dash_results, golden_results):
         return similarity, f"Poor match: {matching}/{total} rows"
 
 
+def _quality_bucket(similarity):
+    """Name the result-quality bucket of a similarity score (None for no match)."""
+    if similarity == 1.0:
+        return 'perfect'
+    if similarity >= 0.8:
+        return 'good'
+    if similarity >= 0.5:
+        return 'partial'
+    if similarity > 0:
+        return 'poor'
+    return None
+
+
+def _append_jsonl(path, record):
+    """Append one compact JSON record as a line to path."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
 def run_enhanced_evaluation():
     """Run enhanced TPC-H evaluation."""
     results = []
     start_time = datetime.now()
-    db_path = '/app/data/tpch_sf1.db'
+    run_id = start_time.isoformat()
+    # One file per day; each query is appended as it finishes (`tail -f` to follow)
+    results_file = f"enhanced_tpch_eval_{start_time.strftime('%Y%m%d')}.jsonl"
 
     print("=" * 80)
     print(f"ENHANCED TPC-H EVALUATION - Started at {start_time}")
@@ -273,6 +322,7 @@ def run_enhanced_evaluation():
                     "duration": agent_duration,
                 })
                 results.append(result)
+                _append_jsonl(results_file, {"run": run_id, **result})
                 print()
                 continue
 
@@ -280,11 +330,11 @@ def run_enhanced_evaluation():
 
             # 3. Execute Dash's SQL
             print("  → Executing Dash SQL...")
-            dash_results, dash_error = execute_sql(dash_sql, db_path)
+            dash_results, dash_error = execute_sql(dash_sql)
 
             # 4. Execute golden SQL
             print("  → Executing golden SQL...")
-            golden_results, golden_error = execute_sql(query['golden_sql'], db_path)
+            golden_results, golden_error = execute_sql(query['golden_sql'])
 
             # 5. Compare results
             if dash_error:
@@ -338,21 +388,38 @@ def run_enhanced_evaluation():
             })
 
         results.append(result)
+        _append_jsonl(results_file, {"run": run_id, **result})
         print()
 
     # Summary
     end_time = datetime.now()
     total_duration = (end_time - start_time).total_seconds()
 
-    successful = [r for r in results if r.get('success', False)]
-    scores = [r.get('score', 0) for r in successful]
+    # One pass over results for every summary statistic
+    successful = []
+    scores = []
+    total_duration_s = 0
+    quality = Counter()
+    cat_totals = Counter()
+    cat_scores = defaultdict(list)
+    for r in results:
+        category = r['category']
+        total_duration_s += r.get('duration', 0)
+        quality[_quality_bucket(r.get('similarity_score', 0))] += 1
+        cat_totals[category] += 1
+        if r.get('success', False):
+            score = r.get('score', 0)
+            successful.append(r)
+            scores.append(score)
+            cat_scores[category].append(score)
+
     avg_score = sum(scores) / len(scores) if scores else 0
-    avg_duration = sum(r.get('duration', 0) for r in results) / len(results) if results else 0
+    avg_duration = total_duration_s / len(results) if results else 0
 
-    perfect_matches = sum(1 for r in results if r.get('similarity_score', 0) == 1.0)
-    good_matches = sum(1 for r in results if 0.8 <= r.get('similarity_score', 0) < 1.0)
-    partial_matches = sum(1 for r in results if 0.5 <= r.get('similarity_score', 0) < 0.8)
-    poor_matches = sum(1 for r in results if 0 < r.get('similarity_score', 0) < 0.5)
+    perfect_matches = quality['perfect']
+    good_matches = quality['good']
+    partial_matches = quality['partial']
+    poor_matches = quality['poor']
 
     print("=" * 80)
     print("ENHANCED EVALUATION SUMMARY")
@@ -373,37 +440,32 @@ def run_enhanced_evaluation():
     print()
 
     # By category
-    categories = set(r['category'] for r in results)
-    for category in sorted(categories):
-        cat_results = [r for r in results if r['category'] == category]
-        cat_successful = [r for r in cat_results if r.get('success', False)]
-        cat_scores = [r.get('score', 0) for r in cat_successful]
-        cat_avg_score = sum(cat_scores) / len(cat_scores) if cat_scores else 0
-        print(f"{category.upper()}: {len(cat_successful)}/{len(cat_results)} success, avg score: {cat_avg_score:.1%}")
-
-    # Save results
-    output_file = f"enhanced_tpch_eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump({
-            "timestamp": start_time.isoformat(),
-            "total_duration_seconds": total_duration,
-            "summary": {
-                "total": len(results),
-                "successful": len(successful),
-                "failed": len(results) - len(successful),
-                "success_rate": len(successful)/len(results),
-                "average_score": avg_score,
-                "average_duration": avg_duration,
-                "perfect_matches": perfect_matches,
-                "good_matches": good_matches,
-                "partial_matches": partial_matches,
-                "poor_matches": poor_matches,
-            },
-            "results": results,
-        }, f, indent=2)
+    for category in sorted(cat_totals):
+        category_scores = cat_scores[category]
+        cat_avg_score = sum(category_scores) / len(category_scores) if category_scores else 0
+        print(f"{category.upper()}: {len(category_scores)}/{cat_totals[category]} success, avg score: {cat_avg_score:.1%}")
+
+    # Per-query records are already in results_file; the summary goes to a sidecar
+    _append_jsonl(SUMMARY_FILE, {
+        "run": run_id,
+        "results_file": results_file,
+        "total_duration_seconds": total_duration,
+        "summary": {
+            "total": len(results),
+            "successful": len(successful),
+            "failed": len(results) - len(successful),
+            "success_rate": len(successful)/len(results),
+            "average_score": avg_score,
+            "average_duration": avg_duration,
+            "perfect_matches": perfect_matches,
+            "good_matches": good_matches,
+            "partial_matches": partial_matches,
+            "poor_matches": poor_matches,
+        },
+    })
 
     print()
-    print(f"Results saved to: {output_file}")
+    print(f"Results appended to: {results_file} (summary: {SUMMARY_FILE})")
     print("=" * 80)
 
     return results
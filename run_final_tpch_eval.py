@@ -4,40 +4,109 @@ Final TPC-H Evaluation for Dash
 Pre-computes golden results, then validates Dash's answers.
 """
 
+import asyncio
+import hashlib
 import json
+import os
+import pickle
 import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
 import duckdb
 from dash.agents import dash
-from tpch_queries_golden import TPCH_GOLDEN_QUERIES
+from tpch_queries_golden import TPCH_GOLDEN_QUERIES, get_queries_by_ids
 
 DB_PATH = '/app/data/tpch_sf1.db'
+GOLDEN_CACHE_PATH = 'golden_cache.pkl'
+SUMMARY_FILE = 'final_tpch_eval_summary.jsonl'
+# Agent runs in flight at once; bounded to stay under LLM rate limits. agno's
+# models share one pooled keep-alive httpx client, so runs reuse connections.
+MAX_CONCURRENT_QUERIES = 4
 
 
-def precompute_golden_results():
-    """Execute all golden SQL queries upfront and cache results."""
+def _golden_key(golden_sql, db_mtime):
+    """Cache key for a golden query: changes when the SQL or the database file changes."""
+    return hashlib.sha256((str(db_mtime) + golden_sql).encode()).hexdigest()
+
+
+def _load_golden_cache():
+    """Load persisted golden results ({key: result}); empty if missing or unreadable."""
+    try:
+        with open(GOLDEN_CACHE_PATH, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return {}
+
+
+def _save_golden_cache(entries):
+    """Atomically rewrite the golden results cache."""
+    tmp_path = f"{GOLDEN_CACHE_PATH}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entries, f)
+    os.replace(tmp_path, GOLDEN_CACHE_PATH)
+
+
+def precompute_golden_results(refresh=False):
+    """Execute all golden SQL queries upfront and cache results.
+
+    Successful results are persisted to GOLDEN_CACHE_PATH, keyed by the SQL and
+    the database file's mtime, so later runs only execute new or changed
+    queries. Pass refresh=True to ignore the persisted results.
+    """
     print("Precomputing golden results from TPC-H queries...")
     golden_cache = {}
 
-    conn = duckdb.connect(DB_PATH, read_only=True)
+    persisted = {} if refresh else _load_golden_cache()
+    db_mtime = os.path.getmtime(DB_PATH)
+    entries = {}
+    misses = []
 
     for query in TPCH_GOLDEN_QUERIES:
-        try:
-            result = conn.execute(query['golden_sql']).fetchall()
-            golden_cache[query['id']] = {
-                "success": True,
-                "results": result,
-                "row_count": len(result),
-            }
-            print(f"  ✓ {query['id']}: {len(result)} rows")
-        except Exception as e:
-            golden_cache[query['id']] = {
-                "success": False,
-                "error": str(e),
-            }
-            print(f"  ✗ {query['id']}: ERROR - {str(e)[:60]}")
-
-    conn.close()
+        key = _golden_key(query['golden_sql'], db_mtime)
+        if key in persisted:
+            entry = persisted[key]
+            # Only raw results are persisted; variants are rebuilt on load so
+            # changes to expected_variants never reuse stale match strings
+            entries[key] = {k: entry[k] for k in ('success', 'results', 'row_count')}
+            golden_cache[query['id']] = {**entries[key], "variants": expected_variants(entry['results'])}
+            print(f"  ✓ {query['id']}: {persisted[key]['row_count']} rows (cached)")
+        else:
+            misses.append((key, query))
+
+    if misses:
+        # One read-only connection, a cursor per worker: DuckDB runs the
+        # queries concurrently instead of idling between them
+        conn = duckdb.connect(DB_PATH, read_only=True)
+
+        def run_golden(sql):
+            with conn.cursor() as cur:
+                return cur.execute(sql).fetchall()
+
+        with ThreadPoolExecutor(max_workers=min(8, len(misses))) as pool:
+            futures = [pool.submit(run_golden, query['golden_sql']) for _, query in misses]
+            for (key, query), future in zip(misses, futures):
+                try:
+                    result = future.result()
+                    entries[key] = {
+                        "success": True,
+                        "results": result,
+                        "row_count": len(result),
+                    }
+                    golden_cache[query['id']] = {**entries[key], "variants": expected_variants(result)}
+                    print(f"  ✓ {query['id']}: {len(result)} rows")
+                except Exception as e:
+                    golden_cache[query['id']] = {
+                        "success": False,
+                        "error": str(e),
+                    }
+                    print(f"  ✗ {query['id']}: ERROR - {str(e)[:60]}")
+
+        conn.close()
+
+    _save_golden_cache(entries)
     print(f"\nCached {len([v for v in golden_cache.values() if v['success']])} golden results\n")
     return golden_cache
 
@@ -60,6 +129,55 @@ def format_value(v):
     return str(v)
 
 
+def _numeric_variants(value):
+    """Distinct string forms a numeric golden value may take in a response.
+
+    Duplicates (an int and its comma-free form are the same string) are
+    dropped so each form costs one substring scan of the response.
+    """
+    # Format variations to check
+    checks = [
+        str(int(value)) if isinstance(value, int) else f"{value:.2f}",
+        f"{value:,.0f}".replace(',', ''),  # Without commas
+        f"{value:.2f}".replace('.', ','),   # European format
+    ]
+
+    # For large numbers, also check abbreviated forms
+    if abs(value) >= 1000000:
+        checks.append(f"{value/1000000:.1f}")  # Millions
+    if abs(value) >= 1000000000:
+        checks.append(f"{value/1000000000:.1f}")  # Billions
+
+    return tuple(dict.fromkeys(checks))
+
+
+def expected_variants(results):
+    """Precompute the strings to look for in a response, per golden value.
+
+    Covers the non-NULL values of the first 5 rows. Each entry is a tuple of
+    upper-cased representations; a value counts as found if any of them
+    appears. Values of other types get an empty tuple: counted, never found.
+    """
+    variants = []
+    for row in results[:5]:
+        for value in row:
+            if value is None:
+                continue
+
+            # DuckDB returns DECIMAL columns (TPC-H prices, their SUMs) as Decimal
+            if isinstance(value, Decimal):
+                value = float(value)
+
+            # Check different representations
+            if isinstance(value, (int, float)):
+                variants.append(_numeric_variants(value))
+            elif isinstance(value, str):
+                variants.append((value.upper(),))
+            else:
+                variants.append(())
+    return variants
+
+
 def check_answer_correctness(response_content, golden_data):
     """Check if golden results are reflected in the response."""
     if not golden_data['success']:
@@ -72,39 +190,13 @@ def check_answer_correctness(response_content, golden_data):
             return 1.0, "Correctly identified empty result", []
         return 0.0, "Expected empty result not mentioned", []
 
-    response_upper = response_content.upper()
-    found_count = 0
-    total_checks = 0
-
-    # Strategy: Check if key values from first few rows appear
-    for row_idx, row in enumerate(results[:5]):  # Check first 5 rows
-        for col_idx, value in enumerate(row):
-            if value is None:
-                continue
-
-            total_checks += 1
+    variants = golden_data.get('variants')
+    if variants is None:
+        variants = expected_variants(results)
 
-            # Check different representations
-            if isinstance(value, (int, float)):
-                # Format variations to check
-                checks = [
-                    str(int(value)) if isinstance(value, int) else f"{value:.2f}",
-                    f"{value:,.0f}".replace(',', ''),  # Without commas
-                    f"{value:.2f}".replace('.', ','),   # European format
-                ]
-
-                # For large numbers, also check abbreviated forms
-                if abs(value) >= 1000000:
-                    checks.append(f"{value/1000000:.1f}")  # Millions
-                if abs(value) >= 1000000000:
-                    checks.append(f"{value/1000000000:.1f}")  # Billions
-
-                if any(check in response_upper for check in checks):
-                    found_count += 1
-
-            elif isinstance(value, str):
-                if value.upper() in response_upper:
-                    found_count += 1
+    response_upper = response_content.upper()
+    total_checks = len(variants)
+    found_count = sum(1 for checks in variants if any(check in response_upper for check in checks))
 
     score = found_count / total_checks if total_checks > 0 else 0.5
 
@@ -118,114 +210,166 @@ def check_answer_correctness(response_content, golden_data):
         return 0.0, f"No expected values found (0/{total_checks})", []
 
 
-def run_final_evaluation(query_ids=None):
-    """Run final TPC-H evaluation."""
-    start_time = datetime.now()
-
-    # Pre-compute all golden results
-    golden_cache = precompute_golden_results()
-
-    # Filter queries
-    queries_to_run = TPCH_GOLDEN_QUERIES
-    if query_ids:
-        queries_to_run = [q for q in TPCH_GOLDEN_QUERIES if q['id'] in query_ids]
-
-    print("=" * 80)
-    print(f"FINAL TPC-H EVALUATION")
-    print(f"Testing: {len(queries_to_run)} queries")
-    print("=" * 80)
-    print()
-
-    results = []
+async def evaluate_query(query, golden_data, semaphore):
+    """Ask Dash one TPC-H question and score the answer against its golden result.
 
-    for i, query in enumerate(queries_to_run, 1):
-        print(f"[{i}/{len(queries_to_run)}] {query['id']}: {query['name']}")
+    Returns the result dict and the progress lines to print for it.
+    """
+    lines = []
+    base = {
+        "id": query['id'],
+        "name": query['name'],
+        "category": query['category'],
+        "complexity": query['complexity'],
+    }
 
-        if query['id'] not in golden_cache or not golden_cache[query['id']]['success']:
-            print(f"  ⚠️  Skipping - golden query failed")
-            results.append({
-                "id": query['id'],
-                "name": query['name'],
-                "category": query['category'],
-                "complexity": query['complexity'],
-                "success": False,
-                "error": "Golden query failed",
-                "score": 0.0,
-            })
-            print()
-            continue
+    if golden_data is None or not golden_data['success']:
+        lines.append(f"  ⚠️  Skipping - golden query failed")
+        return {**base, "success": False, "error": "Golden query failed", "score": 0.0}, lines
 
+    async with semaphore:
         query_start = time.time()
-
         try:
-            # Run Dash
-            print(f"  → Asking Dash...")
-            response = dash.run(query['question'], stream=False)
+            # Run each question on its own copy of Dash (tools, model and db are
+            # shared, per-run state is not) and in its own session, so concurrent
+            # runs don't race on one instance or see each other's history
+            agent = dash.deep_copy(update={"tools": dash.tools})
+            response = await agent.arun(query['question'], stream=False, session_id=f"tpch-eval-{uuid4()}")
             duration = time.time() - query_start
 
             # Validate answer
-            print(f"  → Validating answer...")
-            score, validation_msg, _ = check_answer_correctness(
-                response.content,
-                golden_cache[query['id']]
-            )
+            score, validation_msg, _ = check_answer_correctness(response.content, golden_data)
 
             result = {
-                "id": query['id'],
-                "name": query['name'],
-                "category": query['category'],
-                "complexity": query['complexity'],
+                **base,
                 "success": True,
                 "score": score,
                 "validation": validation_msg,
                 "duration": duration,
                 "response_length": len(response.content),
-                "golden_rows": golden_cache[query['id']]['row_count'],
+                "golden_rows": golden_data['row_count'],
             }
 
             if score >= 0.7:
-                print(f"  ✅ Excellent: {score:.0%} - {validation_msg}")
+                lines.append(f"  ✅ Excellent: {score:.0%} - {validation_msg}")
             elif score >= 0.4:
-                print(f"  ✅ Good: {score:.0%} - {validation_msg}")
+                lines.append(f"  ✅ Good: {score:.0%} - {validation_msg}")
             elif score > 0:
-                print(f"  ⚠️  Partial: {score:.0%} - {validation_msg}")
+                lines.append(f"  ⚠️  Partial: {score:.0%} - {validation_msg}")
             else:
-                print(f"  ❌ Failed: {validation_msg}")
+                lines.append(f"  ❌ Failed: {validation_msg}")
 
-            print(f"  ⏱️  {duration:.1f}s")
+            lines.append(f"  ⏱️  {duration:.1f}s")
 
         except Exception as e:
             result = {
-                "id": query['id'],
-                "name": query['name'],
-                "category": query['category'],
-                "complexity": query['complexity'],
+                **base,
                 "success": False,
                 "error": str(e)[:200],
                 "score": 0.0,
                 "duration": time.time() - query_start,
             }
-            print(f"  ❌ Error: {str(e)[:80]}")
+            lines.append(f"  ❌ Error: {str(e)[:80]}")
+
+    return result, lines
+
 
-        results.append(result)
+def _score_bucket(score):
+    """Answer-correctness bucket used in the summary."""
+    if score >= 0.7:
+        return 'excellent'
+    if score >= 0.4:
+        return 'good'
+    if score > 0:
+        return 'partial'
+    return 'failed'
+
+
+def _append_jsonl(path, record):
+    """Append one compact JSON record as a line to path."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+async def evaluate_queries(queries, golden_cache, results_file, run_id):
+    """Evaluate queries with up to MAX_CONCURRENT_QUERIES agent runs in flight.
+
+    Agent calls are I/O-bound, so overlapping them cuts wall-clock time roughly
+    by the concurrency limit. Every question gets a fresh Agent and session, so
+    answers don't depend on which questions happened to run before them. Progress is printed and each result appended to
+    results_file as its query finishes; results are returned in query order.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+
+    async def run(index, query):
+        result, lines = await evaluate_query(query, golden_cache.get(query['id']), semaphore)
+        return index, result, lines
+
+    tasks = [run(index, query) for index, query in enumerate(queries)]
+    results = [None] * len(queries)
+    for done, task in enumerate(asyncio.as_completed(tasks), 1):
+        index, result, lines = await task
+        query = queries[index]
+        print(f"[{done}/{len(queries)}] {query['id']}: {query['name']}")
+        for line in lines:
+            print(line)
         print()
+        _append_jsonl(results_file, {"run": run_id, **result})
+        results[index] = result
+    return results
+
+
+def run_final_evaluation(query_ids=None, refresh_golden=False):
+    """Run final TPC-H evaluation."""
+    start_time = datetime.now()
+    run_id = start_time.isoformat()
+    # One file per day; each query is appended as it finishes (`tail -f` to follow)
+    results_file = f"final_tpch_eval_{start_time.strftime('%Y%m%d')}.jsonl"
+
+    # Pre-compute all golden results
+    golden_cache = precompute_golden_results(refresh=refresh_golden)
+
+    # Filter queries
+    queries_to_run = TPCH_GOLDEN_QUERIES
+    if query_ids:
+        queries_to_run = get_queries_by_ids(query_ids)
+
+    print("=" * 80)
+    print(f"FINAL TPC-H EVALUATION")
+    print(f"Testing: {len(queries_to_run)} queries")
+    print("=" * 80)
+    print()
+
+    results = asyncio.run(evaluate_queries(queries_to_run, golden_cache, results_file, run_id))
 
     # Summary
     total_duration = (datetime.now() - start_time).total_seconds()
-    scores = [r.get('score', 0) for r in results]
+    # One pass over results for every summary statistic
+    scores = []
+    total_duration_s = 0
+    buckets = Counter()
+    comp_scores = defaultdict(list)
+    for r in results:
+        score = r.get('score', 0)
+        scores.append(score)
+        total_duration_s += r.get('duration', 0)
+        buckets[_score_bucket(score)] += 1
+        comp_scores[r.get('complexity')].append(score)
+
     avg_score = sum(scores) / len(scores) if scores else 0
+    avg_duration = total_duration_s / len(results) if results else 0
 
-    excellent = sum(1 for s in scores if s >= 0.7)
-    good = sum(1 for s in scores if 0.4 <= s < 0.7)
-    partial = sum(1 for s in scores if 0 < s < 0.4)
-    failed = sum(1 for s in scores if s == 0)
+    excellent = buckets['excellent']
+    good = buckets['good']
+    partial = buckets['partial']
+    failed = buckets['failed']
 
     print("=" * 80)
     print("FINAL EVALUATION SUMMARY")
     print("=" * 80)
     print(f"Queries Tested:   {len(results)}")
     print(f"Average Score:    {avg_score:.1%}")
-    print(f"Avg Duration:     {sum(r.get('duration', 0) for r in results) / len(results):.1f}s per query")
+    print(f"Avg Duration:     {avg_duration:.1f}s per query")
     print(f"Total Time:       {total_duration/60:.1f} minutes")
     print()
     print("Answer Correctness:")
@@ -237,31 +381,28 @@ def run_final_evaluation(query_ids=None):
 
     # By complexity
     for complexity in ['low', 'medium', 'high']:
-        comp_results = [r for r in results if r.get('complexity') == complexity]
-        if comp_results:
-            comp_scores = [r.get('score', 0) for r in comp_results]
-            comp_avg = sum(comp_scores) / len(comp_scores)
-            comp_excellent = sum(1 for s in comp_scores if s >= 0.7)
-            print(f"  {complexity.upper():8s}: {comp_excellent:2d}/{len(comp_results):2d} excellent, avg: {comp_avg:.1%}")
-
-    # Save
-    output_file = f"final_tpch_eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump({
-            "timestamp": start_time.isoformat(),
-            "total_duration_seconds": total_duration,
-            "summary": {
-                "total": len(results),
-                "average_score": avg_score,
-                "excellent": excellent,
-                "good": good,
-                "partial": partial,
-                "failed": failed,
-            },
-            "results": results,
-        }, f, indent=2)
-
-    print(f"\n📁 Results: {output_file}")
+        scores_for = comp_scores.get(complexity)
+        if scores_for:
+            comp_avg = sum(scores_for) / len(scores_for)
+            comp_excellent = sum(1 for s in scores_for if s >= 0.7)
+            print(f"  {complexity.upper():8s}: {comp_excellent:2d}/{len(scores_for):2d} excellent, avg: {comp_avg:.1%}")
+
+    # Per-query records are already in results_file; the summary goes to a sidecar
+    _append_jsonl(SUMMARY_FILE, {
+        "run": run_id,
+        "results_file": results_file,
+        "total_duration_seconds": total_duration,
+        "summary": {
+            "total": len(results),
+            "average_score": avg_score,
+            "excellent": excellent,
+            "good": good,
+            "partial": partial,
+            "failed": failed,
+        },
+    })
+
+    print(f"\n📁 Results: {results_file} (summary: {SUMMARY_FILE})")
     print("=" * 80)
 
     return results
@@ -269,5 +410,7 @@ def run_final_evaluation(query_ids=None):
 
 if __name__ == "__main__":
     import sys
-    query_ids = sys.argv[1:] if len(sys.argv) > 1 else None
-    run_final_evaluation(query_ids=query_ids)
+    args = sys.argv[1:]
+    refresh_golden = '--refresh-golden' in args
+    query_ids = [a for a in args if a != '--refresh-golden'] or None
+    run_final_evaluation(query_ids=query_ids, refresh_golden=refresh_golden)
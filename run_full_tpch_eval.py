@@ -5,56 +5,111 @@ Tests Dash against all 22 official TPC-H queries with result validation.
 """
 
 import json
+import sys
 import time
-import re
+import string
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pathlib import Path
-import duckdb
 from dash.agents import dash
-from tpch_queries_golden import TPCH_GOLDEN_QUERIES
+from db.duckdb_url import duckdb_connection
+from tpch_golden_cache import get_golden
+from tpch_queries_golden import TPCH_GOLDEN_QUERIES, get_queries_by_ids
 
 # Evaluation configuration
-DB_PATH = '/app/data/tpch_sf1.db'
 MAX_RETRIES = 2
 TIMEOUT_SECONDS = 120
+# Row cap for fetched results; golden TPC-H results stay far below it, so a
+# query that exceeds it cannot match and is not materialized in full
+MAX_RESULT_ROWS = 100_000
+FETCH_BATCH_ROWS = 8192
+# compare_results stops early on a certain "poor" match once it has this many
+# mismatches, more than the 3 it reports
+MISMATCH_CAP = 10
+
+# ASCII-only uppercasing for case-insensitive SELECT lookups; unlike str.upper()
+# it never changes the string length, so indexes line up with the original
+_ASCII_UPPER = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+
+# Golden queries that miss the disk cache run this many at a time, each on its
+# own pooled connection
+GOLDEN_WORKERS = 4
+
+
+def _golden_or_error(query_id):
+    """get_golden, with any exception returned as that query's error.
+
+    Executor.map re-raises on iteration, so one raising query would otherwise
+    abort the whole golden_map.
+    """
+    try:
+        return get_golden(query_id)
+    except Exception as e:
+        return None, str(e)
 
 
 def extract_sql_from_response(response_content):
-    """Extract SQL from agent response with multiple strategies."""
+    """Extract SQL from agent response with multiple strategies.
+
+    Each strategy is a couple of str.find scans rather than a regex pass.
+    """
     # Strategy 1: Code blocks with sql tag
-    sql_pattern = r'```sql\n(.*?)\n```'
-    matches = re.findall(sql_pattern, response_content, re.DOTALL)
-    if matches:
-        return matches[0].strip()
+    start = response_content.find('```sql\n')
+    if start != -1:
+        end = response_content.find('\n```', start + 7)
+        if end != -1:
+            return response_content[start + 7:end].strip()
 
-    # Strategy 2: Code blocks without tag
-    code_pattern = r'```\n(SELECT[\s\S]*?)\n```'
-    matches = re.findall(code_pattern, response_content, re.IGNORECASE)
-    if matches:
-        return matches[0].strip()
+    upper = response_content.translate(_ASCII_UPPER)
 
-    # Strategy 3: Raw SELECT statements
-    select_pattern = r'(SELECT[\s\S]*?)(?:\n\n|$)'
-    matches = re.findall(select_pattern, response_content, re.IGNORECASE)
-    if matches:
-        return matches[0].strip().rstrip(';')
+    # Strategy 2: Code blocks without tag
+    start = upper.find('```\nSELECT')
+    if start != -1:
+        end = response_content.find('\n```', start + 10)
+        if end != -1:
+            return response_content[start + 4:end].strip()
+
+    # Strategy 3: Raw SELECT statements, up to the next blank line
+    start = upper.find('SELECT')
+    if start != -1:
+        end = response_content.find('\n\n', start + 6)
+        return response_content[start:end if end != -1 else None].strip().rstrip(';')
 
     return None
 
 
-def execute_sql(sql, db_path, timeout=30):
-    """Execute SQL against DuckDB and return results."""
+def execute_sql(sql, timeout=30):
+    """Execute SQL against DuckDB and return results.
+
+    Runs on a connection from the agent's DuckDB engine (a separate read-only
+    connection to the same file would make the agent's fail), inside a
+    transaction that is always rolled back since the SQL comes from the agent.
+    DuckDB has no statement_timeout setting, so a timer interrupts queries
+    still running after timeout seconds.
+    Rows are streamed in batches and fetching stops past MAX_RESULT_ROWS: an
+    oversized result comes back cut to MAX_RESULT_ROWS + 1 rows, so callers can
+    tell it apart and score it as a wrong answer rather than a failed query.
+    """
     try:
-        conn = duckdb.connect(db_path, read_only=True)
-        conn.execute(f"SET statement_timeout={timeout * 1000}")  # milliseconds
-        result = conn.execute(sql).fetchall()
-        conn.close()
-        return result, None
+        with duckdb_connection() as conn:
+            timer = threading.Timer(timeout, conn.interrupt)
+            timer.start()
+            conn.begin()
+            try:
+                result = conn.execute(sql)
+                rows = []
+                while batch := result.fetchmany(FETCH_BATCH_ROWS):
+                    rows.extend(batch)
+                    if len(rows) > MAX_RESULT_ROWS:
+                        del rows[MAX_RESULT_ROWS + 1:]
+                        break
+                return rows, None
+            finally:
+                timer.cancel()
+                conn.rollback()
     except Exception as e:
-        try:
-            conn.close()
-        except:
-            pass
         return None, str(e)
 
 
@@ -71,7 +126,13 @@ def normalize_result(value):
 
 
 def compare_results(dash_results, golden_results, tolerance=0.01):
-    """Compare query results with tolerance for floating point differences."""
+    """Compare query results with tolerance for floating point differences.
+
+    Rows are compared by position, so ordering matters. This stays in Python
+    rather than a DuckDB EXCEPT ALL: both results are already fetched (golden
+    ones usually from the on-disk cache), EXCEPT would re-run both queries and
+    ignores row order, and identical rows are settled by tuple equality.
+    """
     if dash_results is None or golden_results is None:
         return 0.0, "One or both queries failed", None
 
@@ -85,8 +146,22 @@ def compare_results(dash_results, golden_results, tolerance=0.01):
     # Compare row by row
     mismatches = []
     matching_rows = 0
+    total_rows = len(golden_results)
+    scanned_rows = total_rows
 
     for idx, (dash_row, golden_row) in enumerate(zip(dash_results, golden_results)):
+        # Identical rows (the common case) match under any normalization;
+        # tuple equality settles them in C without the per-cell loop
+        if dash_row == golden_row:
+            matching_rows += 1
+            continue
+
+        # With enough mismatches to report, stop once even a match on every
+        # remaining row would leave the similarity below 0.5 (the "poor" bucket)
+        if len(mismatches) >= MISMATCH_CAP and 2 * (matching_rows + total_rows - idx) < total_rows:
+            scanned_rows = idx
+            break
+
         if len(dash_row) != len(golden_row):
             mismatches.append({
                 "row": idx,
@@ -98,6 +173,24 @@ def compare_results(dash_results, golden_results, tolerance=0.01):
 
         row_match = True
         for col_idx, (dash_val, golden_val) in enumerate(zip(dash_row, golden_row)):
+            # Same-type cells skip normalize_result: equal ones always match
+            # and two floats only need rounding
+            if type(dash_val) is type(golden_val):
+                if dash_val == golden_val:
+                    continue
+                if type(dash_val) is float:
+                    diff = abs(round(dash_val, 2) - round(golden_val, 2))
+                    if diff > tolerance:
+                        row_match = False
+                        mismatches.append({
+                            "row": idx,
+                            "column": col_idx,
+                            "dash_value": dash_val,
+                            "golden_value": golden_val,
+                            "diff": diff,
+                        })
+                    continue
+
             dash_norm = normalize_result(dash_val)
             golden_norm = normalize_result(golden_val)
 
@@ -126,6 +219,9 @@ def compare_results(dash_results, golden_results, tolerance=0.01):
 
     similarity = matching_rows / len(golden_results) if golden_results else 0.0
 
+    if scanned_rows < total_rows:
+        # A lower bound: rows after the stop count as mismatches
+        return similarity, f"Poor match: {matching_rows}/{total_rows} rows (stopped after {scanned_rows})", mismatches[:3]
     if similarity == 1.0:
         return 1.0, "Exact match", []
     elif similarity > 0.95:
@@ -138,6 +234,27 @@ def compare_results(dash_results, golden_results, tolerance=0.01):
         return similarity, f"Poor match: {matching_rows}/{len(golden_results)} rows", mismatches[:3]
 
 
+def _quality_bucket(similarity):
+    """Name the result-quality bucket of a similarity score (None for no match)."""
+    if similarity == 1.0:
+        return 'perfect'
+    if similarity >= 0.8:
+        return 'good'
+    if similarity >= 0.5:
+        return 'partial'
+    if similarity > 0:
+        return 'poor'
+    return None
+
+
+def _emit(lines):
+    """Write buffered progress lines in one call, then clear the buffer."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
+
 def run_full_evaluation(query_ids=None, verbose=True):
     """Run full TPC-H evaluation."""
     results = []
@@ -146,7 +263,13 @@ def run_full_evaluation(query_ids=None, verbose=True):
     # Filter queries if specific IDs requested
     queries_to_run = TPCH_GOLDEN_QUERIES
     if query_ids:
-        queries_to_run = [q for q in TPCH_GOLDEN_QUERIES if q['id'] in query_ids]
+        queries_to_run = get_queries_by_ids(query_ids)
+
+    # All golden results up front, in one warm session (or from the disk cache),
+    # before any agent runs
+    ids = [query['id'] for query in queries_to_run]
+    with ThreadPoolExecutor(max_workers=GOLDEN_WORKERS) as pool:
+        golden_map = dict(zip(ids, pool.map(_golden_or_error, ids)))
 
     print("=" * 80)
     print(f"TPC-H FULL EVALUATION - Started at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -155,10 +278,13 @@ def run_full_evaluation(query_ids=None, verbose=True):
     print()
 
     for i, query in enumerate(queries_to_run, 1):
-        print(f"[{i}/{len(queries_to_run)}] {query['id']}: {query['name']}")
-        print(f"  Category: {query['category']}, Complexity: {query['complexity']}")
+        # Progress lines are buffered and written once per query
+        lines = []
+        log = lines.append
+        log(f"[{i}/{len(queries_to_run)}] {query['id']}: {query['name']}")
+        log(f"  Category: {query['category']}, Complexity: {query['complexity']}")
         if verbose:
-            print(f"  Question: {query['question'][:120]}...")
+            log(f"  Question: {query['question'][:120]}...")
 
         query_start = time.time()
         result = {
@@ -172,7 +298,8 @@ def run_full_evaluation(query_ids=None, verbose=True):
         try:
             # 1. Run Dash agent
             if verbose:
-                print("  → Running Dash agent...")
+                log("  → Running Dash agent...")
+            _emit(lines)  # show which query is running before the long wait
             response = dash.run(query['question'], stream=False)
             agent_duration = time.time() - query_start
 
@@ -181,7 +308,7 @@ def run_full_evaluation(query_ids=None, verbose=True):
 
             if not dash_sql:
                 if verbose:
-                    print("  ⚠️  Could not extract SQL, checking if answer is in response...")
+                    log("  ⚠️  Could not extract SQL, checking if answer is in response...")
                 # Sometimes agent answers without showing SQL
                 result.update({
                     "success": True,
@@ -193,23 +320,24 @@ def run_full_evaluation(query_ids=None, verbose=True):
                 })
                 results.append(result)
                 if verbose:
-                    print(f"  ⚠️  No SQL extracted (Duration: {agent_duration:.1f}s)")
-                print()
+                    log(f"  ⚠️  No SQL extracted (Duration: {agent_duration:.1f}s)")
+                log("")
+                _emit(lines)
                 continue
 
             if verbose:
-                print(f"  ✓ Extracted SQL ({len(dash_sql)} chars)")
+                log(f"  ✓ Extracted SQL ({len(dash_sql)} chars)")
 
             # 3. Execute Dash's SQL
-            dash_results, dash_error = execute_sql(dash_sql, DB_PATH)
+            dash_results, dash_error = execute_sql(dash_sql)
 
-            # 4. Execute golden SQL
-            golden_results, golden_error = execute_sql(query['golden_sql'], DB_PATH)
+            # 4. Golden results were computed before the loop
+            golden_results, golden_error = golden_map[query['id']]
 
             # 5. Compare results
             if dash_error:
                 if verbose:
-                    print(f"  ❌ Dash SQL failed: {dash_error[:100]}")
+                    log(f"  ❌ Dash SQL failed: {dash_error[:100]}")
                 result.update({
                     "success": False,
                     "extracted_sql": True,
@@ -220,7 +348,7 @@ def run_full_evaluation(query_ids=None, verbose=True):
                 })
             elif golden_error:
                 if verbose:
-                    print(f"  ⚠️  Golden SQL failed: {golden_error[:100]}")
+                    log(f"  ⚠️  Golden SQL failed: {golden_error[:100]}")
                 result.update({
                     "success": True,
                     "extracted_sql": True,
@@ -231,13 +359,20 @@ def run_full_evaluation(query_ids=None, verbose=True):
                     "score": 0.7,  # Partial credit if dash works
                 })
             else:
-                similarity, comparison_msg, mismatches = compare_results(dash_results, golden_results)
+                truncated = len(dash_results) > MAX_RESULT_ROWS
+                if truncated:
+                    # The SQL ran but fetching stopped at the cap: a wrong answer
+                    similarity, mismatches = 0.0, []
+                    comparison_msg = f"Row count mismatch: more than {MAX_RESULT_ROWS:,} vs {len(golden_results)}"
+                else:
+                    similarity, comparison_msg, mismatches = compare_results(dash_results, golden_results)
 
                 result.update({
                     "success": True,
                     "extracted_sql": True,
                     "dash_sql": dash_sql[:1000],
                     "dash_result_count": len(dash_results),
+                    "dash_result_truncated": truncated,
                     "golden_result_count": len(golden_results),
                     "similarity_score": similarity,
                     "comparison": comparison_msg,
@@ -248,20 +383,20 @@ def run_full_evaluation(query_ids=None, verbose=True):
 
                 if similarity == 1.0:
                     if verbose:
-                        print(f"  ✅ Perfect match! ({len(dash_results)} rows)")
+                        log(f"  ✅ Perfect match! ({len(dash_results)} rows)")
                 elif similarity > 0.8:
                     if verbose:
-                        print(f"  ✅ Good match: {similarity:.1%} ({comparison_msg})")
+                        log(f"  ✅ Good match: {similarity:.1%} ({comparison_msg})")
                 elif similarity > 0.5:
                     if verbose:
-                        print(f"  ⚠️  Partial match: {similarity:.1%} ({comparison_msg})")
+                        log(f"  ⚠️  Partial match: {similarity:.1%} ({comparison_msg})")
                 else:
                     if verbose:
-                        print(f"  ❌ Poor match: {similarity:.1%} ({comparison_msg})")
+                        log(f"  ❌ Poor match: {similarity:.1%} ({comparison_msg})")
 
         except Exception as e:
             if verbose:
-                print(f"  ❌ Error: {str(e)[:100]}")
+                log(f"  ❌ Error: {str(e)[:100]}")
             result.update({
                 "success": False,
                 "error": str(e)[:500],
@@ -271,22 +406,46 @@ def run_full_evaluation(query_ids=None, verbose=True):
 
         results.append(result)
         if verbose:
-            print(f"  Duration: {result['duration']:.1f}s, Score: {result.get('score', 0):.1%}")
-        print()
+            log(f"  Duration: {result['duration']:.1f}s, Score: {result.get('score', 0):.1%}")
+        log("")
+        _emit(lines)
 
     # Generate summary
     end_time = datetime.now()
     total_duration = (end_time - start_time).total_seconds()
 
-    successful = [r for r in results if r.get('success', False)]
-    scores = [r.get('score', 0) for r in results]
-    avg_score = sum(scores) / len(scores) if scores else 0
-    avg_duration = sum(r.get('duration', 0) for r in results) / len(results) if results else 0
-
-    perfect = sum(1 for r in results if r.get('similarity_score', 0) == 1.0)
-    good = sum(1 for r in results if 0.8 <= r.get('similarity_score', 0) < 1.0)
-    partial = sum(1 for r in results if 0.5 <= r.get('similarity_score', 0) < 0.8)
-    poor = sum(1 for r in results if 0 < r.get('similarity_score', 0) < 0.5)
+    # One pass over results for every summary statistic; by_category and
+    # by_complexity map each group to [queries, score total, perfect matches]
+    successful = []
+    failures = []  # failed or scored below 50%, listed for review at the end
+    score_total = 0
+    duration_total = 0
+    quality = Counter()
+    by_category = defaultdict(lambda: [0, 0, 0])
+    by_complexity = defaultdict(lambda: [0, 0, 0])
+    for r in results:
+        score = r.get('score', 0)
+        similarity = r.get('similarity_score', 0)
+        success = r.get('success', False)
+        if success:
+            successful.append(r)
+        if not success or score < 0.5:
+            failures.append(r)
+        score_total += score
+        duration_total += r.get('duration', 0)
+        quality[_quality_bucket(similarity)] += 1
+        for stats in (by_category[r.get('category')], by_complexity[r.get('complexity')]):
+            stats[0] += 1
+            stats[1] += score
+            stats[2] += similarity == 1.0
+
+    avg_score = score_total / len(results) if results else 0
+    avg_duration = duration_total / len(results) if results else 0
+
+    perfect = quality['perfect']
+    good = quality['good']
+    partial = quality['partial']
+    poor = quality['poor']
     failed = len(results) - len(successful)
 
     print("=" * 80)
@@ -311,30 +470,27 @@ def run_full_evaluation(query_ids=None, verbose=True):
     # By category
     print("By Category:")
     for category in ['aggregation', 'complex']:
-        cat_results = [r for r in results if r.get('category') == category]
-        if not cat_results:
+        if category not in by_category:
             continue
-        cat_scores = [r.get('score', 0) for r in cat_results]
-        cat_avg = sum(cat_scores) / len(cat_scores)
-        cat_perfect = sum(1 for r in cat_results if r.get('similarity_score', 0) == 1.0)
-        print(f"  {category.upper():12s}: {cat_perfect:2d}/{len(cat_results):2d} perfect, avg score: {cat_avg:.1%}")
+        count, cat_total, cat_perfect = by_category[category]
+        print(f"  {category.upper():12s}: {cat_perfect:2d}/{count:2d} perfect, avg score: {cat_total / count:.1%}")
 
     # By complexity
     print()
     print("By Complexity:")
     for complexity in ['low', 'medium', 'high']:
-        comp_results = [r for r in results if r.get('complexity') == complexity]
-        if not comp_results:
+        if complexity not in by_complexity:
             continue
-        comp_scores = [r.get('score', 0) for r in comp_results]
-        comp_avg = sum(comp_scores) / len(comp_scores)
-        comp_perfect = sum(1 for r in comp_results if r.get('similarity_score', 0) == 1.0)
-        print(f"  {complexity.upper():8s}: {comp_perfect:2d}/{len(comp_results):2d} perfect, avg score: {comp_avg:.1%}")
+        count, comp_total, comp_perfect = by_complexity[complexity]
+        print(f"  {complexity.upper():8s}: {comp_perfect:2d}/{count:2d} perfect, avg score: {comp_total / count:.1%}")
 
     # Save detailed results
     output_file = f"full_tpch_eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    # Compact json.dumps: the stdlib only uses its C encoder for one-shot dumps
+    # without indent. default=str covers the Decimal and date cells DuckDB
+    # returns, which end up in mismatch details
     with open(output_file, 'w') as f:
-        json.dump({
+        f.write(json.dumps({
             "timestamp": start_time.isoformat(),
             "total_duration_seconds": total_duration,
             "summary": {
@@ -350,14 +506,13 @@ def run_full_evaluation(query_ids=None, verbose=True):
                 "poor_matches": poor,
             },
             "results": results,
-        }, f, indent=2)
+        }, separators=(',', ':'), default=str))
 
     print()
     print(f"📁 Detailed results saved to: {output_file}")
     print("=" * 80)
 
     # Print failures for quick review
-    failures = [r for r in results if not r.get('success', False) or r.get('score', 0) < 0.5]
     if failures:
         print()
         print("⚠️  Queries Needing Attention:")
@@ -373,8 +528,6 @@ def run_full_evaluation(query_ids=None, verbose=True):
 
 
 if __name__ == "__main__":
-    import sys
-
     # Allow running specific queries: python run_full_tpch_eval.py Q1 Q3 Q5
     query_ids = sys.argv[1:] if len(sys.argv) > 1 else None
 
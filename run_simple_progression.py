@@ -7,6 +7,7 @@ Tests same queries 3 times to measure improvement (no golden SQL comparison).
 import json
 import time
 from datetime import datetime
+from os import getenv
 from dash.agents import dash
 
 # Representative queries from different complexity levels
@@ -18,10 +19,28 @@ TEST_QUERIES = [
     "List top 5 suppliers by revenue",
 ]
 
+# DASH_EVAL_CACHE=1 reuses the first response to each question in later runs.
+# Only for regression checks of the harness: it defeats the point of measuring
+# learning progression, so it is off by default.
+USE_AGENT_CACHE = getenv("DASH_EVAL_CACHE") == "1"
+_AGENT_CACHE = {}
+
+
+def _cached_run(question):
+    """Run the agent on question, reusing a cached response if caching is enabled."""
+    if not USE_AGENT_CACHE:
+        return dash.run(question, stream=False)
+    if question not in _AGENT_CACHE:
+        _AGENT_CACHE[question] = dash.run(question, stream=False)
+    return _AGENT_CACHE[question]
+
+
 def run_simple_progression():
     """Run queries 3 times and measure improvement."""
     print("=" * 80)
     print("SIMPLE LEARNING PROGRESSION TEST")
+    if USE_AGENT_CACHE:
+        print("DASH_EVAL_CACHE=1: repeated questions reuse cached responses")
     print("=" * 80)
     print()
 
@@ -40,7 +59,7 @@ def run_simple_progression():
 
             query_start = time.time()
             try:
-                response = dash.run(question, stream=False)
+                response = _cached_run(question)
                 duration = time.time() - query_start
 
                 results.append({
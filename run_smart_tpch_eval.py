@@ -5,66 +5,85 @@ Validates answers by checking if golden SQL results appear in agent responses.
 """
 
 import json
+import sys
 import time
 import re
+from collections import defaultdict
 from datetime import datetime
-import duckdb
 from dash.agents import dash
-from tpch_queries_golden import TPCH_GOLDEN_QUERIES
-
-DB_PATH = '/app/data/tpch_sf1.db'
-
+from tpch_golden_cache import get_golden
+from tpch_queries_golden import TPCH_GOLDEN_QUERIES, get_queries_by_ids
+
+# Search terms per query id; golden results are fixed, so formatting them once
+# serves every later evaluation in the process
+_TERMS_CACHE = {}
+# Runs of digits and separators, the tokens numeric search terms are made of
+_NUMBER_RE = re.compile(r'[\d.,]+')
+
+
+def _search_terms(value):
+    """Distinct strings whose presence in a response counts as finding a numeric value.
+
+    Built directly in comma and comma-free forms, with no str.replace pass.
+    The "$123,456" forms are left out: they contain "123,456", so they can
+    only match when that term does.
+    """
+    return tuple(dict.fromkeys((
+        f"{value:,.0f}",  # 123,456
+        f"{value:.0f}",   # 123456
+        f"{value:.2f}",   # 123456.78
+        f"{int(value)}",  # 123456 (truncated, not rounded)
+    )))
+
+
+def _build_terms(golden_results):
+    """Index the search terms for the golden values a response is checked against.
+
+    Returns the values (non-NULL numbers and strings of the first 10 rows) and
+    a {search term: [indexes into values]} dict, so a term shared by several
+    values (repeated keys, equal totals) is scanned for only once.
+    """
+    values = []
+    term_values = defaultdict(list)
+    for row in golden_results[:10]:  # Check first 10 rows
+        for value in row:
+            # Numeric values in several formats, strings as-is
+            if isinstance(value, (int, float)):
+                terms = _search_terms(value)
+            elif isinstance(value, str):
+                terms = (value.upper(),)
+            else:
+                continue
+            for term in terms:
+                term_values[term].append(len(values))
+            values.append(value)
+    return values, dict(term_values)
 
-def execute_golden_sql(sql, db_path):
-    """Execute golden SQL and return results."""
-    try:
-        conn = duckdb.connect(db_path, read_only=True)
-        result = conn.execute(sql).fetchall()
-        conn.close()
-        return result, None
-    except Exception as e:
-        return None, str(e)
 
+def check_answer_in_response(response_content, golden_results, terms=None):
+    """Check if golden results appear in the agent's response.
 
-def check_answer_in_response(response_content, golden_results):
-    """Check if golden results appear in the agent's response."""
+    terms is the output of _build_terms(golden_results), built here if omitted.
+    """
     if not golden_results:
         return 0.0, "No golden results to compare", []
 
-    found_values = []
-    missing_values = []
     response_upper = response_content.upper()
-
-    # Check for numeric values (with some tolerance)
-    for row in golden_results[:10]:  # Check first 10 rows
-        for value in row:
-            if value is None:
-                continue
-
-            # Normalize value for searching
-            if isinstance(value, (int, float)):
-                # Try different formats
-                search_terms = [
-                    f"{value:,.0f}",  # 123,456
-                    f"{value:.2f}",   # 123456.78
-                    f"{int(value)}",  # 123456
-                    f"${value:,.0f}", # $123,456
-                ]
-
-                value_found = any(term in response_upper or term.replace(',', '') in response_upper
-                                 for term in search_terms)
-
-                if value_found:
-                    found_values.append(value)
-                else:
-                    missing_values.append(value)
-
-            elif isinstance(value, str):
-                # Search for string values
-                if value.upper() in response_upper:
-                    found_values.append(value)
-                else:
-                    missing_values.append(value)
+    values, term_values = terms if terms is not None else _build_terms(golden_results)
+
+    # Numbers written as standalone tokens are found with a set lookup; the
+    # substring scan still catches the rest (say "1,234." ending a sentence)
+    response_numbers = set(_NUMBER_RE.findall(response_upper))
+    found = [False] * len(values)
+    for term, indexes in term_values.items():
+        if all(found[index] for index in indexes):
+            continue  # every value with this term is already found
+        if term in response_numbers or term in response_upper:
+            for index in indexes:
+                found[index] = True
+
+    found_values = [value for value, hit in zip(values, found) if hit]
+    missing_values = [value for value, hit in zip(values, found) if not hit]
 
     # Calculate score
     total_values = len(found_values) + len(missing_values)
@@ -81,6 +100,14 @@ def check_answer_in_response(response_content, golden_results):
         return score, f"Weak: {len(found_values)}/{total_values} values found", found_values[:5]
 
 
+def _emit(lines):
+    """Write buffered progress lines in one call, then clear the buffer."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
+
 def run_smart_evaluation(query_ids=None, verbose=True):
     """Run smart TPC-H evaluation based on answer correctness."""
     results = []
@@ -88,7 +115,11 @@ def run_smart_evaluation(query_ids=None, verbose=True):
 
     queries_to_run = TPCH_GOLDEN_QUERIES
     if query_ids:
-        queries_to_run = [q for q in TPCH_GOLDEN_QUERIES if q['id'] in query_ids]
+        queries_to_run = get_queries_by_ids(query_ids)
+
+    # All golden results up front, in one warm session (or from the disk cache),
+    # before any agent runs
+    golden_map = {query['id']: get_golden(query['id']) for query in queries_to_run}
 
     print("=" * 80)
     print(f"SMART TPC-H EVALUATION - Started at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -98,9 +129,12 @@ def run_smart_evaluation(query_ids=None, verbose=True):
     print()
 
     for i, query in enumerate(queries_to_run, 1):
-        print(f"[{i}/{len(queries_to_run)}] {query['id']}: {query['name']}")
+        # Progress lines are buffered and written once per query
+        lines = []
+        log = lines.append
+        log(f"[{i}/{len(queries_to_run)}] {query['id']}: {query['name']}")
         if verbose:
-            print(f"  Category: {query['category']}, Complexity: {query['complexity']}")
+            log(f"  Category: {query['category']}, Complexity: {query['complexity']}")
 
         query_start = time.time()
         result = {
@@ -112,14 +146,12 @@ def run_smart_evaluation(query_ids=None, verbose=True):
         }
 
         try:
-            # 1. Execute golden SQL to get expected answer
-            if verbose:
-                print("  → Executing golden SQL...")
-            golden_results, golden_error = execute_golden_sql(query['golden_sql'], DB_PATH)
+            # 1. Golden results (expected answer) were computed before the loop
+            golden_results, golden_error = golden_map[query['id']]
 
             if golden_error:
                 if verbose:
-                    print(f"  ⚠️  Golden SQL error: {golden_error[:80]}")
+                    log(f"  ⚠️  Golden SQL error: {golden_error[:80]}")
                 result.update({
                     "success": False,
                     "error": f"Golden SQL failed: {golden_error}",
@@ -127,27 +159,34 @@ def run_smart_evaluation(query_ids=None, verbose=True):
                     "score": 0.0,
                 })
                 results.append(result)
-                print()
+                log("")
+                _emit(lines)
                 continue
 
             golden_row_count = len(golden_results) if golden_results else 0
             if verbose:
-                print(f"  ✓ Golden query returned {golden_row_count} rows")
+                log(f"  ✓ Golden query returned {golden_row_count} rows")
 
             # 2. Run Dash agent
             if verbose:
-                print("  → Running Dash agent...")
+                log("  → Running Dash agent...")
+            _emit(lines)  # show which query is running before the long wait
+            # Not streamed: every golden value is searched for in the whole
+            # response, so a stream would have to be buffered in full anyway
             response = dash.run(query['question'], stream=False)
             agent_duration = time.time() - query_start
 
             if verbose:
-                print(f"  ✓ Agent responded ({len(response.content)} chars)")
+                log(f"  ✓ Agent responded ({len(response.content)} chars)")
 
             # 3. Check if golden results appear in response
             if verbose:
-                print("  → Validating answer correctness...")
+                log("  → Validating answer correctness...")
+            terms = _TERMS_CACHE.get(query['id'])
+            if terms is None:
+                terms = _TERMS_CACHE[query['id']] = _build_terms(golden_results)
             score, comparison_msg, found_values = check_answer_in_response(
-                response.content, golden_results
+                response.content, golden_results, terms
             )
 
             result.update({
@@ -164,17 +203,17 @@ def run_smart_evaluation(query_ids=None, verbose=True):
             # Display result
             if score >= 0.8:
                 if verbose:
-                    print(f"  ✅ Excellent: {score:.1%} ({comparison_msg})")
+                    log(f"  ✅ Excellent: {score:.1%} ({comparison_msg})")
             elif score >= 0.5:
                 if verbose:
-                    print(f"  ✅ Good: {score:.1%} ({comparison_msg})")
+                    log(f"  ✅ Good: {score:.1%} ({comparison_msg})")
             else:
                 if verbose:
-                    print(f"  ⚠️  Weak: {score:.1%} ({comparison_msg})")
+                    log(f"  ⚠️  Weak: {score:.1%} ({comparison_msg})")
 
         except Exception as e:
             if verbose:
-                print(f"  ❌ Error: {str(e)[:100]}")
+                log(f"  ❌ Error: {str(e)[:100]}")
             result.update({
                 "success": False,
                 "error": str(e)[:500],
@@ -184,8 +223,9 @@ def run_smart_evaluation(query_ids=None, verbose=True):
 
         results.append(result)
         if verbose:
-            print(f"  ⏱️  Duration: {result['duration']:.1f}s")
-        print()
+            log(f"  ⏱️  Duration: {result['duration']:.1f}s")
+        log("")
+        _emit(lines)
 
     # Summary
     end_time = datetime.now()
@@ -225,8 +265,10 @@ def run_smart_evaluation(query_ids=None, verbose=True):
 
     # Save results
     output_file = f"smart_tpch_eval_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    # Compact json.dumps: the stdlib only uses its C encoder for one-shot dumps
+    # without indent (pretty-print with `python -m json.tool` when reading by hand)
     with open(output_file, 'w') as f:
-        json.dump({
+        f.write(json.dumps({
             "timestamp": start_time.isoformat(),
             "evaluation_type": "smart_answer_validation",
             "total_duration_seconds": total_duration,
@@ -239,7 +281,7 @@ def run_smart_evaluation(query_ids=None, verbose=True):
                 "failed": failed,
             },
             "results": results,
-        }, f, indent=2)
+        }, separators=(',', ':')))
 
     print(f"📁 Results saved to: {output_file}")
     print("=" * 80)
@@ -248,7 +290,6 @@ def run_smart_evaluation(query_ids=None, verbose=True):
 
 
 if __name__ == "__main__":
-    import sys
     query_ids = sys.argv[1:] if len(sys.argv) > 1 else None
 
     if query_ids:
@@ -0,0 +1,58 @@
+"""Check that the folded date literals in the golden TPC-H SQL match the original interval arithmetic."""
+
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from db.duckdb_url import get_duckdb_engine
+from tpch_queries_golden import get_query_by_id
+
+# (query id, column and operator, original expression, literal it was folded to)
+FOLDED_DATES = [
+    ("Q1", "l_shipdate <=", "DATE '1998-12-01' - INTERVAL '90' DAY", "DATE '1998-09-02'"),
+    ("Q4", "o_orderdate <", "DATE '1993-07-01' + INTERVAL '3' MONTH", "DATE '1993-10-01'"),
+    ("Q5", "o_orderdate <", "DATE '1994-01-01' + INTERVAL '1' YEAR", "DATE '1995-01-01'"),
+    ("Q6", "l_shipdate <", "DATE '1994-01-01' + INTERVAL '1' YEAR", "DATE '1995-01-01'"),
+    ("Q10", "o_orderdate <", "DATE '1993-10-01' + INTERVAL '3' MONTH", "DATE '1994-01-01'"),
+    ("Q12", "l_receiptdate <", "DATE '1994-01-01' + INTERVAL '1' YEAR", "DATE '1995-01-01'"),
+    ("Q14", "l_shipdate <", "DATE '1995-09-01' + INTERVAL '1' MONTH", "DATE '1995-10-01'"),
+    ("Q15", "l_shipdate <", "DATE '1996-01-01' + INTERVAL '3' MONTH", "DATE '1996-04-01'"),
+    ("Q20", "l_shipdate <", "DATE '1994-01-01' + INTERVAL '1' YEAR", "DATE '1995-01-01'"),
+]
+
+PARAMS = pytest.mark.parametrize(
+    ("query_id", "condition", "original", "folded"), FOLDED_DATES, ids=[entry[0] for entry in FOLDED_DATES]
+)
+
+
+def _original_sql(query_id: str, condition: str, original: str, folded: str) -> str:
+    """The query's golden SQL with the folded predicate put back to its interval arithmetic."""
+    return get_query_by_id(query_id)["golden_sql"].replace(f"{condition} {folded}", f"{condition} {original}")
+
+
+@pytest.fixture(scope="module")
+def sf1():
+    """Read-only connection to the TPC-H SF1 database; skips when the file is not there."""
+    db_path = get_duckdb_engine().url.database
+    if not Path(db_path).exists():
+        pytest.skip(f"TPC-H database not found at {db_path}")
+    conn = duckdb.connect(db_path, read_only=True)
+    yield conn
+    conn.close()
+
+
+@PARAMS
+def test_folded_literal_matches_interval(query_id, condition, original, folded):
+    assert get_query_by_id(query_id)["golden_sql"].count(f"{condition} {folded}") == 1
+    with duckdb.connect() as conn:
+        # DuckDB evaluates the interval arithmetic as a timestamp; compare as dates
+        assert conn.execute(f"SELECT CAST({original} AS DATE) = {folded}").fetchone()[0]
+
+
+@PARAMS
+def test_folded_query_returns_original_result(sf1, query_id, condition, original, folded):
+    folded_rows = sf1.execute(get_query_by_id(query_id)["golden_sql"]).fetchall()
+    original_rows = sf1.execute(_original_sql(query_id, condition, original, folded)).fetchall()
+    # Ties in ORDER BY may come back in either order
+    assert sorted(folded_rows, key=repr) == sorted(original_rows, key=repr)
@@ -0,0 +1,78 @@
+"""
+Golden TPC-H results shared by the eval scripts.
+
+get_golden(query_id) returns (results, error) for a query in
+tpch_queries_golden. Successful results are kept per process and pickled
+under GOLDEN_CACHE_DIR, keyed by the SQL and the mtime of the agent's DuckDB
+file (DUCKDB_PATH), so the full and smart evaluators execute each golden
+query once between them.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from db.duckdb_url import duckdb_connection, get_duckdb_engine
+from tpch_queries_golden import get_query_by_id
+
+GOLDEN_CACHE_DIR = '.golden_cache'
+
+_RESULTS = {}
+
+
+def _execute(sql):
+    """Execute golden SQL on a connection from the agent's DuckDB engine.
+
+    Sharing the agent's engine keeps one DuckDB config per file; a separate
+    read-only connection would make the agent's own connections fail.
+    """
+    try:
+        with duckdb_connection() as conn:
+            return conn.execute(sql).fetchall(), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _load_or_execute(sql):
+    """Golden SQL results from the disk cache, executing and storing them on a miss."""
+    try:
+        mtime = os.path.getmtime(get_duckdb_engine().url.database)
+    except OSError as e:
+        return None, str(e)
+    key = hashlib.blake2b(f"{mtime}\0{sql}".encode()).hexdigest()
+    path = Path(GOLDEN_CACHE_DIR) / f"{key}.pkl"
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f), None
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    result, error = _execute(sql)
+    if error is None:
+        # The cache is an optimisation; a failed write still returns the result
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+    return result, error
+
+
+def get_golden(query_id):
+    """Return (results, error) for the golden SQL of query_id (e.g. 'Q1').
+
+    Errors are returned rather than cached, so a failed query is retried on
+    the next call.
+    """
+    cached = _RESULTS.get(query_id)
+    if cached is not None:
+        return cached
+
+    result, error = _load_or_execute(get_query_by_id(query_id)['golden_sql'])
+    if error is None:
+        _RESULTS[query_id] = (result, None)
+    return result, error
@@ -15,6 +15,8 @@ Each query includes:
 Source: PostgreSQL implementation from Vonng/pgtpc GitHub repository
 """
 
+from collections import defaultdict
+
 TPCH_GOLDEN_QUERIES = [
     {
         "id": "Q1",
@@ -33,7 +35,7 @@ SELECT
     AVG(l_discount) AS avg_disc,
     COUNT(*) AS count_order
 FROM lineitem
-WHERE l_shipdate <= DATE '1998-12-01' - INTERVAL '90' DAY
+WHERE l_shipdate <= DATE '1998-09-02'
 GROUP BY l_returnflag, l_linestatus
 ORDER BY l_returnflag, l_linestatus
 """,
@@ -114,7 +116,7 @@ SELECT
 FROM orders
 WHERE
     o_orderdate >= DATE '1993-07-01'
-    AND o_orderdate < DATE '1993-07-01' + INTERVAL '3' MONTH
+    AND o_orderdate < DATE '1993-10-01'
     AND EXISTS (
         SELECT *
         FROM lineitem
@@ -144,7 +146,7 @@ WHERE
     AND n_regionkey = r_regionkey
     AND r_name = 'ASIA'
     AND o_orderdate >= DATE '1994-01-01'
-    AND o_orderdate < DATE '1994-01-01' + INTERVAL '1' YEAR
+    AND o_orderdate < DATE '1995-01-01'
 GROUP BY n_name
 ORDER BY revenue DESC
 """,
@@ -160,7 +162,7 @@ SELECT SUM(l_extendedprice * l_discount) AS revenue
 FROM lineitem
 WHERE
     l_shipdate >= DATE '1994-01-01'
-    AND l_shipdate < DATE '1994-01-01' + INTERVAL '1' YEAR
+    AND l_shipdate < DATE '1995-01-01'
     AND l_discount BETWEEN 0.05 AND 0.07
     AND l_quantity < 24
 """,
@@ -283,7 +285,7 @@ WHERE
     c_custkey = o_custkey
     AND l_orderkey = o_orderkey
     AND o_orderdate >= DATE '1993-10-01'
-    AND o_orderdate < DATE '1993-10-01' + INTERVAL '3' MONTH
+    AND o_orderdate < DATE '1994-01-01'
     AND l_returnflag = 'R'
     AND c_nationkey = n_nationkey
 GROUP BY c_custkey, c_name, c_acctbal, c_phone, n_name, c_address, c_comment
@@ -343,7 +345,7 @@ WHERE
     AND l_commitdate < l_receiptdate
     AND l_shipdate < l_commitdate
     AND l_receiptdate >= DATE '1994-01-01'
-    AND l_receiptdate < DATE '1994-01-01' + INTERVAL '1' YEAR
+    AND l_receiptdate < DATE '1995-01-01'
 GROUP BY l_shipmode
 ORDER BY l_shipmode
 """,
@@ -389,7 +391,7 @@ FROM lineitem, part
 WHERE
     l_partkey = p_partkey
     AND l_shipdate >= DATE '1995-09-01'
-    AND l_shipdate < DATE '1995-09-01' + INTERVAL '1' MONTH
+    AND l_shipdate < DATE '1995-10-01'
 """,
         "category": "aggregation",
         "complexity": "low",
@@ -406,7 +408,7 @@ WITH revenue0 (supplier_no, total_revenue) AS (
     FROM lineitem
     WHERE
         l_shipdate >= DATE '1996-01-01'
-        AND l_shipdate < DATE '1996-01-01' + INTERVAL '3' MONTH
+        AND l_shipdate < DATE '1996-04-01'
     GROUP BY l_suppkey
 )
 SELECT
@@ -562,7 +564,7 @@ WHERE
                     l_partkey = ps_partkey
                     AND l_suppkey = ps_suppkey
                     AND l_shipdate >= DATE '1994-01-01'
-                    AND l_shipdate < DATE '1994-01-01' + INTERVAL '1' YEAR
+                    AND l_shipdate < DATE '1995-01-01'
             )
     )
     AND s_nationkey = n_nationkey
@@ -648,22 +650,35 @@ ORDER BY cntrycode
 ]
 
 
+# Lookup indexes, built once at import
+_QUERIES_BY_ID = {q["id"]: q for q in TPCH_GOLDEN_QUERIES}
+_QUERIES_BY_CATEGORY = defaultdict(list)
+_QUERIES_BY_COMPLEXITY = defaultdict(list)
+for _query in TPCH_GOLDEN_QUERIES:
+    _QUERIES_BY_CATEGORY[_query["category"]].append(_query)
+    _QUERIES_BY_COMPLEXITY[_query["complexity"]].append(_query)
+del _query
+
+
 def get_query_by_id(query_id: str) -> dict:
     """Retrieve a specific query by its ID (e.g., 'Q1')."""
-    for query in TPCH_GOLDEN_QUERIES:
-        if query["id"] == query_id:
-            return query
-    return None
+    return _QUERIES_BY_ID.get(query_id)
+
+
+def get_queries_by_ids(query_ids: list) -> list:
+    """Retrieve the queries with the given IDs, in definition order; unknown IDs are skipped."""
+    wanted = set(query_ids)
+    return [q for q in TPCH_GOLDEN_QUERIES if q["id"] in wanted]
 
 
 def get_queries_by_category(category: str) -> list:
     """Retrieve all queries of a specific category."""
-    return [q for q in TPCH_GOLDEN_QUERIES if q["category"] == category]
+    return list(_QUERIES_BY_CATEGORY.get(category, ()))
 
 
 def get_queries_by_complexity(complexity: str) -> list:
     """Retrieve all queries of a specific complexity level."""
-    return [q for q in TPCH_GOLDEN_QUERIES if q["complexity"] == complexity]
+    return list(_QUERIES_BY_COMPLEXITY.get(complexity, ()))
 
 
 if __name__ == "__main__":
@@ -4,15 +4,46 @@ Validate Dash's Self-Learning Capability
 Tests that agent can discover schema and learn from errors WITHOUT pre-configured knowledge.
 """
 
+import asyncio
+import hashlib
 import json
+import os
+import queue
+import shelve
+import statistics
+import sys
+import threading
 import time
 from datetime import datetime
-from dash.agents import dash
+from uuid import uuid4
+from sqlalchemy import func, select
+from dash.agents import dash, dash_learnings
 
-# Test queries designed to trigger learning
+# Agent runs in flight at once within a parallel stage
+MAX_CONCURRENT_QUERIES = 4
+
+# DASH_VALIDATION_CACHE=1 reuses the response to a repeated question, within a run
+# and across runs (kept in RESPONSE_CACHE_FILE). Only for debugging the harness:
+# a cached answer says nothing about what the agent learned, so it is off by default.
+USE_RESPONSE_CACHE = os.getenv("DASH_VALIDATION_CACHE") == "1"
+RESPONSE_CACHE_FILE = '.validation_cache'
+
+# Per-query records go to a dated validation_results_*.jsonl as they finish;
+# each run's summary is appended here
+SUMMARY_FILE = 'validation_summary.jsonl'
+
+# Emoji status markers on UTF-8 output, plain ASCII elsewhere (e.g. CI logs)
+if (sys.stdout.encoding or '').lower().replace('-', '') == 'utf8':
+    OK, FAIL, FILE = "✅", "❌", "📁"
+else:
+    OK, FAIL, FILE = "[OK]", "[FAIL]", "[FILE]"
+
+# Test queries designed to trigger learning. Queries in a "parallel" stage are
+# independent and run concurrently; the other stages build on earlier learnings
 LEARNING_TEST_QUERIES = [
     {
         "stage": "discovery",
+        "parallel": True,
         "queries": [
             {
                 "id": "T1",
@@ -55,6 +86,7 @@ LEARNING_TEST_QUERIES = [
     },
     {
         "stage": "generalization",
+        "parallel": True,
         "queries": [
             {
                 "id": "Q-similar",
@@ -66,89 +98,234 @@ LEARNING_TEST_QUERIES = [
     },
 ]
 
+# Lowercased once here rather than per response
+for _stage_group in LEARNING_TEST_QUERIES:
+    for _query in _stage_group['queries']:
+        if 'check_for' in _query:
+            _query['check_for_lower'] = tuple(item.lower() for item in _query['check_for'])
+del _stage_group, _query
+
+
+async def _cached_run(question, session_id):
+    """Return the agent's response content for question and whether it was cached."""
+    if not USE_RESPONSE_CACHE:
+        return (await dash.arun(question, stream=False, session_id=session_id)).content, False
+
+    key = hashlib.blake2b(question.encode()).hexdigest()
+    with shelve.open(RESPONSE_CACHE_FILE) as cache:
+        if key in cache:
+            return cache[key], True
+    content = (await dash.arun(question, stream=False, session_id=session_id)).content
+    with shelve.open(RESPONSE_CACHE_FILE) as cache:
+        cache[key] = content
+    return content, False
+
+
+async def run_query(query, stage, semaphore, session_id=None):
+    """Run one test query; returns its result and the progress lines to print."""
+    lines = [
+        f"[{query['id']}] {query['question']}",
+        f"Expected: {query['expected_behavior']}",
+    ]
+
+    async with semaphore:
+        start_time = time.perf_counter()
+        try:
+            content, cached = await _cached_run(query['question'], session_id)
+            duration = 0.0 if cached else time.perf_counter() - start_time
+        except Exception as e:
+            return {
+                "id": query['id'],
+                "stage": stage,
+                "question": query['question'],
+                "success": False,
+                "error": str(e),
+                "duration": time.perf_counter() - start_time,
+            }, lines + [f"{FAIL} Error: {e}"]
+
+    # Check for expected content. One lowercased copy plus substring tests is
+    # several times faster than an IGNORECASE regex search per item
+    content_lower = content.lower()
+    found_items = [
+        item for item, item_lower in zip(query.get('check_for', ()), query.get('check_for_lower', ()))
+        if item_lower in content_lower
+    ]
+
+    result = {
+        "id": query['id'],
+        "stage": stage,
+        "question": query['question'],
+        "success": True,
+        "duration": duration,
+        "cached": cached,
+        "response_length": len(content),
+        "found_items": found_items,
+        "expected_items": query.get('check_for', []),
+        "response_preview": content[:400],
+        # Short digest so results can be compared across stages without the full text
+        "response_hash": hashlib.blake2b(content.encode(), digest_size=8).hexdigest(),
+    }
+
+    lines.append(f"{OK} Success ({'cached' if cached else f'{duration:.1f}s'})")
+    if found_items:
+        lines.append(f"   Found: {', '.join(found_items)}")
+    lines.append(f"   Response: {len(content)} chars")
+
+    return result, lines
+
+
+# Progress text for the printer thread, so a slow stdout never stalls the event
+# loop (and with it the timing of queries still in flight)
+_OUTPUT = queue.SimpleQueue()
+
+
+def _printer():
+    """Write queued progress text to stdout until the None sentinel arrives."""
+    while (text := _OUTPUT.get()) is not None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+
+def _emit(lines):
+    """Queue buffered progress lines as one write, then clear the buffer."""
+    if lines:
+        _OUTPUT.put("\n".join(lines) + "\n")
+        lines.clear()
+
+
+def _note_repeat(result, lines, first_runs):
+    """Compare a repeated question's result with the first successful run of it.
+
+    learned_from_cache marks a repeat that returned the same answer in under
+    half the time, a hint the agent reused what it learned rather than redoing
+    the work.
+    """
+    if not result['success']:
+        return
+    first = first_runs.setdefault(result['question'], result)
+    if first is result:
+        return
+    same_answer = result['response_hash'] == first['response_hash']
+    result['repeat_of'] = first['id']
+    result['learned_from_cache'] = (
+        same_answer and not result['cached'] and result['duration'] < 0.5 * first['duration']
+    )
+    lines.append(f"   Repeat of {first['id']}: {'same' if same_answer else 'different'} answer, "
+                 f"{result['duration']:.1f}s vs {first['duration']:.1f}s")
+
+
+def _append_jsonl(path, record):
+    """Append one compact JSON record as a line to path.
+
+    The line goes out in a single os.write on an O_APPEND descriptor, with no
+    buffered text file around it, so each record is one syscall.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+    finally:
+        os.close(fd)
+
+
+async def run_stages(results_file, run_id):
+    """Run every stage in order; returns all results and the per-stage summaries.
+
+    Each result is appended to results_file as its query finishes.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+    # First successful result per question, for spotting repeats
+    first_runs = {}
+    all_results = []
+    stage_summaries = []
+    printer = threading.Thread(target=_printer, daemon=True)
+    printer.start()
+
+    try:
+        for stage_group in LEARNING_TEST_QUERIES:
+            stage = stage_group['stage']
+            queries = stage_group['queries']
+
+            _emit(["", '=' * 80, f"STAGE: {stage.upper()}", '=' * 80, ""])
+
+            if stage_group.get('parallel'):
+                # Each run in its own session so concurrent runs don't share history;
+                # print each query as it finishes, keep results in query order
+                async def run(index, query):
+                    return index, await run_query(query, stage, semaphore, f"validation-{uuid4()}")
+
+                stage_results = [None] * len(queries)
+                for task in asyncio.as_completed([run(index, query) for index, query in enumerate(queries)]):
+                    index, (result, lines) = await task
+                    _note_repeat(result, lines, first_runs)
+                    lines.append("")
+                    _emit(lines)
+                    _append_jsonl(results_file, {"run": run_id, **result})
+                    stage_results[index] = result
+            else:
+                stage_results = []
+                for query in queries:
+                    result, lines = await run_query(query, stage, semaphore)
+                    _note_repeat(result, lines, first_runs)
+                    lines.append("")
+                    _emit(lines)
+                    _append_jsonl(results_file, {"run": run_id, **result})
+                    stage_results.append(result)
+            all_results.extend(stage_results)
+
+            # Stage summary
+            successful = 0
+            durations = []
+            for r in stage_results:
+                successful += r['success']
+                durations.append(r['duration'])
+            avg_duration = statistics.fmean(durations) if durations else 0.0
+
+            stage_summary = {
+                "stage": stage,
+                "total": len(stage_results),
+                "successful": successful,
+                "avg_duration": avg_duration,
+                "median_duration": statistics.median(durations) if durations else 0.0,
+            }
+            stage_summaries.append(stage_summary)
+
+            _emit([f"Stage Summary: {successful}/{len(stage_results)} successful, avg {avg_duration:.1f}s", ""])
+    finally:
+        # Drain queued output before the caller prints the final summary
+        _OUTPUT.put(None)
+        printer.join()
+
+    return all_results, stage_summaries
+
+
+def _count_learnings():
+    """Row count of the dash_learnings vector table, or None if it can't be read.
+
+    PgVector.get_count() logs failures and returns 0, which can't be told
+    apart from an empty table.
+    """
+    vector_db = dash_learnings.vector_db
+    try:
+        with vector_db.Session() as sess:
+            return sess.execute(select(func.count()).select_from(vector_db.table)).scalar_one()
+    except Exception:
+        return None
+
 
 def run_validation():
     """Run validation tests."""
+    run_started = datetime.now()
+    run_id = run_started.isoformat()
+    results_file = f"validation_results_{run_started.strftime('%Y%m%d')}.jsonl"
+    learnings_before = _count_learnings()
     print("=" * 80)
     print("VALIDATING DASH SELF-LEARNING CAPABILITY")
+    if USE_RESPONSE_CACHE:
+        print("DASH_VALIDATION_CACHE=1: repeated questions reuse cached responses")
     print("=" * 80)
     print()
 
-    all_results = []
-    stage_summaries = []
-
-    for stage_group in LEARNING_TEST_QUERIES:
-        stage = stage_group['stage']
-        queries = stage_group['queries']
-
-        print(f"\n{'='*80}")
-        print(f"STAGE: {stage.upper()}")
-        print(f"{'='*80}\n")
-
-        stage_results = []
-
-        for query in queries:
-            print(f"[{query['id']}] {query['question']}")
-            print(f"Expected: {query['expected_behavior']}")
-
-            start_time = time.time()
-
-            try:
-                response = dash.run(query['question'], stream=False)
-                duration = time.time() - start_time
-
-                # Check for expected content
-                found_items = []
-                if 'check_for' in query:
-                    for item in query['check_for']:
-                        if item.lower() in response.content.lower():
-                            found_items.append(item)
-
-                result = {
-                    "id": query['id'],
-                    "stage": stage,
-                    "question": query['question'],
-                    "success": True,
-                    "duration": duration,
-                    "response_length": len(response.content),
-                    "found_items": found_items,
-                    "expected_items": query.get('check_for', []),
-                    "response_preview": response.content[:400],
-                }
-
-                print(f"✅ Success ({duration:.1f}s)")
-                if found_items:
-                    print(f"   Found: {', '.join(found_items)}")
-                print(f"   Response: {len(response.content)} chars")
-
-            except Exception as e:
-                result = {
-                    "id": query['id'],
-                    "stage": stage,
-                    "question": query['question'],
-                    "success": False,
-                    "error": str(e),
-                    "duration": time.time() - start_time,
-                }
-                print(f"❌ Error: {e}")
-
-            stage_results.append(result)
-            all_results.append(result)
-            print()
-
-        # Stage summary
-        successful = sum(1 for r in stage_results if r.get('success', False))
-        avg_duration = sum(r.get('duration', 0) for r in stage_results) / len(stage_results)
-
-        stage_summary = {
-            "stage": stage,
-            "total": len(stage_results),
-            "successful": successful,
-            "avg_duration": avg_duration,
-        }
-        stage_summaries.append(stage_summary)
-
-        print(f"Stage Summary: {successful}/{len(stage_results)} successful, avg {avg_duration:.1f}s\n")
+    all_results, stage_summaries = asyncio.run(run_stages(results_file, run_id))
 
     # Final summary
     print("=" * 80)
@@ -160,34 +337,34 @@ def run_validation():
 
     print()
     print("Key Validations:")
-    print(f"  ✅ Discovery: Can find tables/columns without hints")
-    print(f"  ✅ Execution: Can query unknown schemas")
-    print(f"  ✅ Learning: Can save and retrieve learnings")
-    print(f"  ✅ Generic: Works without dataset-specific knowledge")
+    print(f"  {OK} Discovery: Can find tables/columns without hints")
+    print(f"  {OK} Execution: Can query unknown schemas")
+    print(f"  {OK} Learning: Can save and retrieve learnings")
+    print(f"  {OK} Generic: Works without dataset-specific knowledge")
 
     # Check for learnings
     print()
     print("Checking for saved learnings...")
-    try:
-        import duckdb
-        conn = duckdb.connect('/app/data/tpch_sf1.db', read_only=True)
-        # Can't actually query learnings DB from here, but agent should have saved them
-        print("  (Learnings are saved in PostgreSQL dash_learnings table)")
-        conn.close()
-    except:
-        pass
-
-    # Save results
-    output_file = f"validation_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(output_file, 'w') as f:
-        json.dump({
-            "timestamp": datetime.now().isoformat(),
-            "principle": "Zero dataset-specific knowledge - pure self-learning",
-            "stage_summaries": stage_summaries,
-            "results": all_results,
-        }, f, indent=2)
-
-    print(f"\n📁 Results saved to: {output_file}")
+    # Row count of the PostgreSQL dash_learnings vector table, before and after the run
+    # Unknown (None) if either count failed, rather than a bogus difference
+    learnings_after = _count_learnings()
+    if learnings_before is None or learnings_after is None:
+        learnings_saved = None
+        print("  n/a new learning rows in dash_learnings (could not count them)")
+    else:
+        learnings_saved = learnings_after - learnings_before
+        print(f"  {learnings_saved} new learning rows in dash_learnings")
+
+    # Per-query records are already in results_file; the summary goes to a sidecar
+    _append_jsonl(SUMMARY_FILE, {
+        "run": run_id,
+        "results_file": results_file,
+        "principle": "Zero dataset-specific knowledge - pure self-learning",
+        "stage_summaries": stage_summaries,
+        "learnings_saved": learnings_saved,
+    })
+
+    print(f"\n{FILE} Results: {results_file} (summary: {SUMMARY_FILE})")
     print("=" * 80)
 
     return all_results